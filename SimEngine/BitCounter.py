@@ -0,0 +1,52 @@
+#!/usr/bin/python
+'''
+\brief Per-cell use counters over cell bitmaps.
+'''
+
+#============================ imports =========================================
+
+#============================ defines =========================================
+
+#============================ helpers =========================================
+
+def bits(bitmap):
+    ''' yields the indexes of the bits set in bitmap '''
+    while bitmap:
+        low     = bitmap & -bitmap
+        yield low.bit_length()-1
+        bitmap ^= low
+
+#============================ body ============================================
+
+class BitCounter(object):
+    '''
+    Number of users (motes, neighbors) of each cell, with the bitmaps of the
+    cells used at least once ('any') and at least twice ('multi'), so the
+    cells used by the others than a given user are a couple of bitwise
+    operations away.
+    '''
+
+    def __init__(self):
+        self.counts                    = {}  # indexed by bit
+        self.any                       = 0
+        self.multi                     = 0
+
+    def update(self,old,new):
+        ''' one user's bitmap changes from old to new '''
+        for bit in bits(old & ~new):
+            self.counts[bit] -= 1
+            if self.counts[bit]==1:
+                self.multi            &= ~(1<<bit)
+            elif self.counts[bit]==0:
+                self.any              &= ~(1<<bit)
+                del self.counts[bit]
+        for bit in bits(new & ~old):
+            self.counts[bit] = self.counts.get(bit,0)+1
+            if self.counts[bit]==1:
+                self.any              |= 1<<bit
+            elif self.counts[bit]==2:
+                self.multi            |= 1<<bit
+
+    def getOthers(self,bitmap):
+        ''' cells used by a user other than the one using bitmap '''
+        return self.multi | (self.any & ~bitmap)
@@ -0,0 +1,110 @@
+#!/usr/bin/python
+'''
+\brief A cell in the TSCH schedule of a mote.
+'''
+
+#============================ imports =========================================
+
+import collections
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Cell(object):
+    '''
+    Slotted to keep the per-cell memory small and constant. The debug fields
+    are only allocated when debugHistory is not 0, and then only keep the
+    last debugHistory entries.
+
+    The TX history only keeps the outcome of the last NUM_MAX_HISTORY
+    transmissions, as a bitmask (bit 0 is the most recent, 1 if ACKed),
+    together with the number of transmissions and ACKs it holds.
+
+    Fields can also be accessed as cell['field'], like the dictionaries
+    previously used to represent cells.
+
+    The direction is a small int, DIR_NAMES gives its name for the outputs.
+    '''
+
+    NUM_MAX_HISTORY = 32
+
+    DIR_TX          = 0
+    DIR_RX          = 1
+    DIR_SHARED      = 2
+    DIR_NAMES       = {DIR_TX: 'TX', DIR_RX: 'RX', DIR_SHARED: 'SHARED'}
+
+    __slots__ = (
+        'ts',
+        'ch',
+        'dir',
+        'neighbor',
+        'numTx',
+        'numTxAck',
+        'numRx',
+        'broadCell_id',
+        'history',
+        'numHistoryTx',
+        'numHistoryTxAck',
+        'waitingfor',
+        'rxDetectedCollision',
+        'debug_canbeInterfered',   # [debug] shows schedule collision that can be interfered with minRssi or larger level
+        'debug_interference',      # [debug] shows an interference packet with minRssi or larger level
+        'debug_lockInterference',  # [debug] shows locking on the interference packet
+        'debug_cellCreatedAsn',    # [debug]
+    )
+
+    def __init__(self,ts,ch,dir,neighbor,broadCell_id=None,asn=None,debugHistory=0):
+
+        self.ts                        = ts
+        self.ch                        = ch
+        self.dir                       = dir
+        self.neighbor                  = neighbor
+        self.numTx                     = 0
+        self.numTxAck                  = 0
+        self.numRx                     = 0
+        self.broadCell_id              = broadCell_id
+        self.history                   = 0
+        self.numHistoryTx              = 0
+        self.numHistoryTxAck           = 0
+        self.waitingfor                = None
+        self.rxDetectedCollision       = False
+
+        if debugHistory:
+            self.debug_canbeInterfered = collections.deque(maxlen=debugHistory)
+            self.debug_interference    = collections.deque(maxlen=debugHistory)
+            self.debug_lockInterference= collections.deque(maxlen=debugHistory)
+            self.debug_cellCreatedAsn  = asn
+        else:
+            self.debug_canbeInterfered = None
+            self.debug_interference    = None
+            self.debug_lockInterference= None
+            self.debug_cellCreatedAsn  = None
+
+    #======================== public ==========================================
+
+    def __getitem__(self,name):
+        return getattr(self,name)
+
+    def __setitem__(self,name,value):
+        setattr(self,name,value)
+
+    def logHistory(self,isACKed):
+        ''' add the outcome of a transmission to the TX history '''
+        if self.numHistoryTx==self.NUM_MAX_HISTORY:
+            # drop the oldest entry
+            self.numHistoryTxAck      -= (self.history>>(self.NUM_MAX_HISTORY-1))&1
+        else:
+            self.numHistoryTx         += 1
+        self.history                   = ((self.history<<1)|isACKed)&((1<<self.NUM_MAX_HISTORY)-1)
+        self.numHistoryTxAck          += isACKed
+
+    #===== debug
+
+    def logInterference(self,interferenceFlag):
+        if self.debug_interference is not None:
+            self.debug_interference.append(interferenceFlag)
+
+    def logLockInterference(self,lockFlag):
+        if self.debug_lockInterference is not None:
+            self.debug_lockInterference.append(lockFlag)
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+'''
+\brief Which motes interfere with which, for the schedulers and statistics.
+'''
+
+#============================ imports =========================================
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class ConflictGraph(object):
+    '''
+    Interference relations between motes, derived from the RSSI of the
+    topology. A link tx->rx conflicts with the cells of:
+    - the motes interfering with tx or rx (RSSI at least minRssi-8dB), which
+      the opt2 scheduler keeps clear of, see getInterferers().
+    - the transmitters reaching rx (RSSI at least minRssi), which make a
+      schedule collision effective, see interferes().
+
+    The topology does not change during a run, the relations are computed
+    once with update() after the topology is created, and again if it is
+    ever recreated.
+    '''
+
+    def __init__(self,motes):
+        self.interferers               = {}  # indexed by mote, list of motes
+        self.interferedBy              = {}  # indexed by mote, list of the motes it is an interferer of
+        self.reach                     = {}  # indexed by mote, set of the motes it reaches
+        self.update(motes)
+
+    #======================== public ==========================================
+
+    def update(self,motes):
+        self.interferers               = dict([(m,m._myInterferersNeigbors()) for m in motes])
+        self.interferedBy              = dict([(m,[]) for m in motes])
+        for m in motes:
+            for i in self.interferers[m]:
+                self.interferedBy[i]  += [m]
+        # the motes reached (minRssi) are among the interferers (minRssi-8dB)
+        self.reach                     = dict([(m,set([n for n in self.interferers[m] if n!=m and m.getRSSI(n)>=n.minRssi])) for m in motes])
+
+    def getInterferers(self,mote):
+        ''' returns the motes whose RSSI from mote is at least minRssi-8dB '''
+        return self.interferers[mote]
+
+    def getInterferedBy(self,mote):
+        ''' returns the motes mote is an interferer of '''
+        return self.interferedBy[mote]
+
+    def interferes(self,tx,rx):
+        ''' True if the signal of tx is received at rx (RSSI at least minRssi) '''
+        return rx in self.reach[tx]
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+'''
+\brief The RPL DODAG formed by the preferred parents of the motes.
+'''
+
+#============================ imports =========================================
+
+import heapq
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Dodag(object):
+    '''
+    Children, ancestors and subtree sizes of each mote, updated each time a
+    mote changes its preferred parent (setParent), so they can be read
+    without walking the tree.
+
+    The ancestors of a mote are the motes on its path of preferred parents,
+    up to the DAG root or a mote without a preferred parent.
+    '''
+
+    def __init__(self,motes):
+        self.parent                    = dict([(m,None)        for m in motes])
+        self.children                  = dict([(m,[])          for m in motes])
+        self.ancestors                 = dict([(m,frozenset()) for m in motes])
+        self.subtreeSize               = dict([(m,1)           for m in motes])  # including the mote itself
+
+    #======================== public ==========================================
+
+    def setParent(self,mote,parent):
+        oldParent = self.parent[mote]
+        if parent==oldParent:
+            return
+
+        # a mote cannot pick a parent in its own subtree
+        assert parent==None or (parent!=mote and mote not in self.ancestors[parent])
+
+        # move the subtree
+        if oldParent:
+            self.children[oldParent].remove(mote)
+            for a in [oldParent]+list(self.ancestors[oldParent]):
+                self.subtreeSize[a] -= self.subtreeSize[mote]
+        self.parent[mote] = parent
+        if parent:
+            self.children[parent].append(mote)
+            for a in [parent]+list(self.ancestors[parent]):
+                self.subtreeSize[a] += self.subtreeSize[mote]
+
+        # the ancestors of the whole subtree change
+        subtree = [mote]
+        while subtree:
+            m = subtree.pop()
+            if self.parent[m]:
+                self.ancestors[m] = self.ancestors[self.parent[m]] | frozenset([self.parent[m]])
+            else:
+                self.ancestors[m] = frozenset()
+            subtree += self.children[m]
+
+    def getShortestPaths(self,root):
+        '''
+        Dijkstra over the rank increases (ETX) of the links, from root.
+        Returns the parent and the rank of the motes reached, which is where
+        RPL converges to without parent switch threshold.
+        '''
+        parents = {}
+        ranks   = {root:0}
+        done    = set()
+        heap    = [(0,root.id,root)]
+        while heap:
+            (rank,_,parent) = heapq.heappop(heap)
+            if parent in done:
+                continue
+            done.add(parent)
+            # parent sends its DIO to its neighbors, with the filters of RPL
+            for child in parent._myNeigbors():
+                if child in done or child.dagRoot:
+                    continue
+                rankIncrease = child._rpl_calcRankIncrease(parent)
+                if rankIncrease==None or rankIncrease>min([child.RPL_MAX_RANK_INCREASE, child.RPL_MAX_TOTAL_RANK-rank]):
+                    continue
+                if child not in ranks or rank+rankIncrease<ranks[child]:
+                    parents[child] = parent
+                    ranks[child]   = rank+rankIncrease
+                    heapq.heappush(heap,(ranks[child],child.id,child))
+        return (parents,ranks)
+    
+    def getChildren(self,mote):
+        return self.children[mote]
+
+    def getSubtreeSize(self,mote):
+        ''' number of motes whose path to the root goes through mote, mote included '''
+        return self.subtreeSize[mote]
+
+    def getDepth(self,mote):
+        ''' number of hops to the root (or to the first mote without preferred parent) '''
+        return len(self.ancestors[mote])
+
+    def isAncestor(self,ancestor,mote):
+        ''' True if ancestor is on the path of preferred parents of mote '''
+        return ancestor in self.ancestors[mote]
@@ -25,7 +25,7 @@ log.addHandler(NullHandler())
 
 #============================ imports =========================================
 
-import copy
+import collections
 import random
 import threading
 import math
@@ -34,9 +34,20 @@ import SimEngine
 import SimSettings
 import Propagation
 import Topology
+import Cell
+import Schedule
+import Neighborhood
+import Packet
 
 #============================ defines =========================================
 
+def _statsGauge(name):
+    ''' attribute of the mote kept in the statistics of the network (MoteStats) '''
+    return property(
+        lambda self:       self.engine.moteStats.get(self.id,name),
+        lambda self,value: self.engine.moteStats.set(self.id,name,value),
+    )
+
 #============================ body ============================================
 
 class Mote(object):
@@ -44,23 +55,35 @@ class Mote(object):
     # sufficient num. of tx to estimate pdr by ACK
     NUM_SUFFICIENT_TX                  = 10
     # maximum number of tx for history
-    NUM_MAX_HISTORY                    = 32
+    NUM_MAX_HISTORY                    = Cell.Cell.NUM_MAX_HISTORY
     
-    DIR_TX                             = 'TX'
-    DIR_RX                             = 'RX'
-    DIR_SHARED                         = 'SHARED'
+    DIR_TX                             = Cell.Cell.DIR_TX
+    DIR_RX                             = Cell.Cell.DIR_RX
+    DIR_SHARED                         = Cell.Cell.DIR_SHARED
     
     BROAD                              = 'BROADCAST'
     
-    DEBUG                              = 'DEBUG'
-    INFO                               = 'INFO'
-    WARNING                            = 'WARNING'
-    ERROR                              = 'ERROR'
+    DEBUG                              = logging.DEBUG
+    INFO                               = logging.INFO
+    WARNING                            = logging.WARNING
+    ERROR                              = logging.ERROR
     
     #=== app
-    APP_TYPE_DATA                      = 'DATA'
-    APP_TYPE_MYTRAFFIC                 = 'TRAFFICOMIO'
-    SIXP_TYPE_MYSCHEDULE                 = 'SIXP_TYPE_MYSCHEDULE'
+    APP_TYPE_DATA                      = Packet.Packet.TYPE_DATA
+    APP_TYPE_MYTRAFFIC                 = Packet.Packet.TYPE_MYTRAFFIC
+    SIXP_TYPE_MYSCHEDULE               = Packet.Packet.TYPE_MYSCHEDULE
+    
+    #=== statistics
+    numPacketSent                      = _statsGauge('numPacketSent')
+    numPacketReceived                  = _statsGauge('numPacketReceived')
+    numTransmissions                   = _statsGauge('numTransmissions')
+    numReceptions                      = _statsGauge('numReceptions')
+    numReqCells                        = _statsGauge('numReqCells')
+    threq                              = _statsGauge('threq')
+    hopsToRoot                         = _statsGauge('hopsToRoot')
+    numRandomSelections                = _statsGauge('numRandomSelections')
+    txQueueFill                        = _statsGauge('txQueueFill')
+    chargeConsumed                     = property(lambda self: self.engine.moteStats.getCharge(self.id))
     
     #=== rpl
     RPL_PARENT_SWITCH_THRESHOLD        = 384 # 2*ETX
@@ -94,6 +117,13 @@ class Mote(object):
     CHARGE_TxData_uC                   = 49.37
     CHARGE_RxDataTxAck_uC              = 76.90
     CHARGE_RxData_uC                   = 64.65
+    CHARGES_uC                         = {  # indexed by radio activity (see _logChargeConsumed)
+        'chargeIdle':                    CHARGE_Idle_uC,
+        'chargeTxDataRxAck':             CHARGE_TxDataRxAck_uC,
+        'chargeTxData':                  CHARGE_TxData_uC,
+        'chargeRxDataTxAck':             CHARGE_RxDataTxAck_uC,
+        'chargeRxData':                  CHARGE_RxData_uC,
+    }
     
     def __init__(self,id):
         
@@ -125,6 +155,9 @@ class Mote(object):
         self.neighborRank              = {}                    # indexed by neighbor
         self.neighborDagRank           = {}                    # indexed by neighbor
         self.trafficPortionPerParent   = {}                    # indexed by parent, portion of outgoing traffic
+        self.rplDIOsReceived           = []                    # (neighbor,asn) of the DIOs not processed yet (rplBatchHousekeeping)
+        self.rplTrickleInterval        = None                  # current Trickle interval, in slotframes (rplTrickle)
+        self.rplTrickleCounter         = 0                     # DIOs heard in the current Trickle interval
         # otf
         self.asnOTFevent               = None
         self.otfHousekeepingPeriod     = self.settings.otfHousekeepingPeriod
@@ -142,10 +175,11 @@ class Mote(object):
         self.sixtopPdrThreshold           = self.settings.sixtopPdrThreshold
         self.sixtopHousekeepingPeriod  = self.settings.sixtopHousekeepingPeriod
         # tsch
-        self.txQueue                   = []
-        self.pktToSend                 = []                 #list of packets to send in one ts (in different channels)
-        self.schedule                  = {}                 # indexed by ts and ch  contains info of the all the channels in each ts 
-        self.scheduleNeigborhood       = {}               # indexed by ts and ch contains the cells used in my neighborhood                    
+        self.txQueue                   = collections.deque()  # packets in flight are the first ones, see pktToSend
+        self.pktToSend                 = {}                 # indexed by channel, packet in flight in the current ts
+        self.schedule                  = Schedule.Schedule(self.settings.slotframeLength,self.settings.numChans,logChanges=(self.settings.scheduler=='deBras')) # indexed by ts and ch  contains info of the all the channels in each ts 
+        self.scheduleBroadcastVersion  = 0                  # version of my schedule in my last broadcast
+        self.neighborhood              = Neighborhood.Neighborhood(self) # the cells used in my neighborhood
         
         #self.waitingFor                = None               #not used, using multichannel capabilities
         self.timeCorrectedSlot         = None
@@ -158,16 +192,10 @@ class Mote(object):
         # wireless
         self.RSSI                      = {}                    # indexed by neighbor
         self.PDR                       = {}                    # indexed by neighbor
+        self.etx                       = {}                    # indexed by neighbor, cache of _estimateETX()
         # location
-        # battery
-        self.chargeConsumed            = 0
-        
-        # stats
-        self._stats_resetMoteStats()
-        self._stats_resetQueueStats()
-        self._stats_resetLatencyStats()
-        self._stats_resetHopsStats()
-        self._stats_resetRadioStats()
+        # stats, in the statistics of the network (see the properties above)
+        self.txQueueFill               = 0
         
         #emunicio
         self.numPacketSent                 = 0 #total number of packets sent     
@@ -207,12 +235,23 @@ class Mote(object):
     
     #===== role
     
+    def rpl_setOracleRoute(self,parent,parentRank,rank):
+        ''' set the route computed at boot (rplOracle), as a DIO from parent would '''
+        with self.dataLock:
+            self.engine.dodag.setParent(self,parent)
+            self.preferredParent                 = parent
+            self.rank                            = rank
+            self.dagRank                         = int(rank/self.RPL_MIN_HOP_RANK_INCREASE)
+            self.parentSet                       = [parent]
+            self.neighborRank[parent]            = parentRank
+            self.neighborDagRank[parent]         = int(parentRank/self.RPL_MIN_HOP_RANK_INCREASE)
+            self.trafficPortionPerParent         = {parent: 1.0}
+            self.timeCorrectedSlot               = self.engine.getAsn()
+    
     def role_setDagRoot(self):
         self.dagRoot              = True
         self.rank                 = 0
         self.dagRank              = 0
-        self.packetLatencies      = [] # in slots
-        self.packetHops           = []
         
     
     #===== application
@@ -228,12 +267,12 @@ class Mote(object):
                     delay            = self.pkPeriod*(1+random.uniform(-self.settings.pkPeriodVar,self.settings.pkPeriodVar)) 
                 else:
                     # compute initial time within the range of [next asn, next asn+pkPeriod]
-                    delay            = self.settings.slotDuration + (self.settings.slotframeLength/6)*random.random() + (self.settings.slotframeLength/6) 
-		    # max at 16.9 or 33 seconds for a frame length of 101
+                    delay            = self.settings.slotDuration + self.settings.trafficStart*random.random() + self.settings.trafficStart
+		    # between trafficStart and 2*trafficStart seconds
                          
                 assert delay>0   
                               
-                if (self.engine.asn < (96*self.settings.slotframeLength)):  #cycle 96
+                if (self.engine.asn < (self.settings.trafficStop*self.settings.slotframeLength)):
                        
                     # schedule
                     self.engine.scheduleIn(
@@ -249,16 +288,17 @@ class Mote(object):
         print "Preparing packet bursts in "+str(self.id)
         # schedule numPacketsBurst packets at burstTimestamp
         for i in xrange(self.settings.numPacketsBurst):
+            # one tag per packet, scheduling with the same tag would cancel the previous packets
             self.engine.scheduleIn(
                 delay        = self.settings.burstTimestamp,
                 cb           = self._app_action_enqueueData,
-                uniqueTag    = (self.id, '_app_action_enqueueData_burst1'),
+                uniqueTag    = (self.id, '_app_action_enqueueData_burst1', i),
                 priority     = 2,
             )
             self.engine.scheduleIn(
                 delay        = 3*self.settings.burstTimestamp,
                 cb           = self._app_action_enqueueData,
-                uniqueTag    = (self.id, '_app_action_enqueueData_burst2'),
+                uniqueTag    = (self.id, '_app_action_enqueueData_burst2', i),
                 priority     = 2,
             )
             
@@ -279,7 +319,7 @@ class Mote(object):
   
         self.threq=self.hopsToRoot 
     
-        if (self.engine.asn < (96*self.settings.slotframeLength)) and (self.engine.asn > (63*self.settings.slotframeLength)): #calc 97-131 rows
+        if self.engine.inMeasurementWindow():
             self.probePacketsGenerated+=1
 
 
@@ -287,13 +327,13 @@ class Mote(object):
         self.numPacketSent+=1  # from app layer  
 
         # only start sending data if I have some TX cells
-        if self.getTxCells():
-            newPacket = {
-                'asn':            self.engine.getAsn(),
-                'type':           self.APP_TYPE_MYTRAFFIC,
-                'payload':        [self.id,self.engine.getAsn(),1], # the payload is used for latency and number of hops calculation
-                'retriesLeft':    self.TSCH_MAXTXRETRIES
-            }
+        if self.schedule.getNumCells(self.DIR_TX):
+            newPacket = Packet.Packet(
+                asn            = self.engine.getAsn(),
+                type           = self.APP_TYPE_MYTRAFFIC,
+                origin         = self.id,  # origin, createdAsn and numHops are used for latency and number of hops calculation
+                retriesLeft    = self.TSCH_MAXTXRETRIES,
+            )
             
                         
                       
@@ -339,7 +379,13 @@ class Mote(object):
                 if self.id!=0 and self.otfTriggered != True:
                     self._otf_schedule_housekeeping(firstOtf=True)
                     self.otfTriggered=True
-                                                
+            
+            # with Trickle, the next DIO is scheduled by the interval timer
+            if self.settings.rplTrickle:
+                if firstDIO:
+                    self._rpl_trickle_startInterval(self._rpl_trickle_getImin())
+                return
+            
             # schedule at start of next cycle
             self.engine.scheduleAtAsn(
                 asn         = asn-ts+cycle*self.settings.slotframeLength,
@@ -380,10 +426,16 @@ class Mote(object):
                     if self not in neighbor.rplRxDIO:
                         neighbor.rplRxDIO[self]       = 0
                     neighbor.rplRxDIO[self]          += 1
+                    neighbor.rplTrickleCounter       += 1
                     
                     # update my mote stats
                     self._stats_incrementMoteStats('rplRxDIO') # TODO: TX DIO?
                     
+                    if self.settings.rplBatchHousekeeping:
+                        # in neighbor, process this DIO with the others sent at this ASN
+                        neighbor._rpl_schedule_processDIOs(self)
+                        continue
+                    
                     # skip useless housekeeping
                     if not neighbor.rank or self.rank<neighbor.rank:
                         # in neighbor, do RPL housekeeping
@@ -400,6 +452,91 @@ class Mote(object):
             # schedule to send the next DIO
             self._rpl_schedule_sendDIO()
     
+    def _rpl_trickle_startInterval(self,interval):
+        ''' start a Trickle interval (RFC6206) of interval slotframes '''
+        
+        with self.dataLock:
+            
+            asn    = self.engine.getAsn()
+            ts     = asn%self.settings.slotframeLength
+            
+            self.rplTrickleInterval   = interval
+            self.rplTrickleCounter    = 0
+            
+            # DIO at a random slotframe in the second half of the interval
+            t = int(math.ceil(interval/2.0+random.random()*interval/2.0))
+            
+            # a reset replaces the events of the current interval, even at this ASN
+            self.engine.scheduleAtAsn(
+                asn               = asn-ts+t*self.settings.slotframeLength,
+                cb                = self._rpl_action_trickleDIO,
+                uniqueTag         = (self.id,'_rpl_action_trickleDIO'),
+                priority          = 3,
+                exceptCurrentASN  = False,
+            )
+            self.engine.scheduleAtAsn(
+                asn               = asn-ts+interval*self.settings.slotframeLength,
+                cb                = self._rpl_action_trickleInterval,
+                uniqueTag         = (self.id,'_rpl_action_trickleInterval'),
+                priority          = 3,
+                exceptCurrentASN  = False,
+            )
+    
+    def _rpl_action_trickleDIO(self):
+        with self.dataLock:
+            if self.rplTrickleCounter<self.DEFAULT_DIO_REDUNDANCY_CONSTANT:
+                self._rpl_action_sendDIO()
+            else:
+                # suppressed, enough DIOs heard in this interval
+                self._rpl_schedule_sendDIO()
+    
+    def _rpl_action_trickleInterval(self):
+        with self.dataLock:
+            self._rpl_trickle_startInterval(min(2*self.rplTrickleInterval,self._rpl_trickle_getImin()*2**self.DEFAULT_DIO_INTERVAL_DOUBLINGS))
+    
+    def _rpl_trickle_reset(self):
+        with self.dataLock:
+            if self.rplTrickleInterval>self._rpl_trickle_getImin():
+                self._rpl_trickle_startInterval(self._rpl_trickle_getImin())
+    
+    def _rpl_trickle_getImin(self):
+        ''' the minimum Trickle interval is dioPeriod, in slotframes '''
+        return int(math.ceil(self.settings.dioPeriod/(self.settings.slotframeLength*self.settings.slotDuration)))
+    
+    def _rpl_schedule_processDIOs(self,neighbor):
+        ''' queue the DIO received from neighbor, they are all processed at the next ASN '''
+        
+        with self.dataLock:
+            
+            asn = self.engine.getAsn()
+            
+            if not self.rplDIOsReceived:
+                self.engine.scheduleAtAsn(
+                    asn         = asn+1,
+                    cb          = self._rpl_action_processDIOs,
+                    uniqueTag   = (self.id,'_rpl_action_processDIOs'),
+                    priority    = 3,
+                )
+            
+            self.rplDIOsReceived += [(neighbor,asn)]
+    
+    def _rpl_action_processDIOs(self):
+        ''' run the RPL housekeeping once for all the DIOs queued '''
+        
+        with self.dataLock:
+            
+            received             = self.rplDIOsReceived
+            self.rplDIOsReceived = []
+            
+            # skip useless housekeeping
+            if not self.rank or min([self.neighborRank[n] for (n,_) in received])<self.rank:
+                self._rpl_housekeeping()
+            
+            # update time correction
+            for (neighbor,asn) in received:
+                if neighbor == self.preferredParent:
+                    self.timeCorrectedSlot = asn
+    
     def _rpl_housekeeping(self):
         with self.dataLock:
             
@@ -419,24 +556,11 @@ class Mote(object):
 
                 if rankIncrease!=None and rankIncrease<=min([self.RPL_MAX_RANK_INCREASE, self.RPL_MAX_TOTAL_RANK-neighborRank]): 
 
-                    #check if there is a loop and if exists, skip the neighbor         
-		    rootReached=False
-		    skipNeighbor=False
-	            inode=neighbor
-		    while rootReached==False:
-			if inode.preferredParent!=None:
-			    if inode.preferredParent.id==self.id:
-				skipNeighbor=True
-			    if inode.preferredParent.id==0:
-				rootReached=True
-			    else:
-				inode=inode.preferredParent
-			else:
-			    rootReached=True
-		    if skipNeighbor==True:
-		        continue
+                    # skip the neighbor if I am on its path to the root (loop)
+                    if self.engine.dodag.isAncestor(self,neighbor):
+                        continue
   
-		    # record this potential rank                   
+                    # record this potential rank
                     potentialRanks[neighbor] = neighborRank+rankIncrease
             
             # sort potential ranks
@@ -495,6 +619,11 @@ class Mote(object):
                     )
 
                 # store new preferred parent and rank
+                if newPreferredParent!=self.preferredParent:
+                    self.engine.dodag.setParent(self,newPreferredParent)
+                    # inconsistency, DIOs at the fastest rate again
+                    if self.settings.rplTrickle:
+                        self._rpl_trickle_reset()
                 (self.preferredParent,self.rank) = (newPreferredParent,newrank)
                 
                 # calculate DAGrank
@@ -528,11 +657,10 @@ class Mote(object):
                         (neighbor.id,[p.id for p in self.parentSet]),
                     )
                 
-                    tsList=[(ts,ch) for (ts,ch), cell in self.schedule.iteritems() if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX]
+                    tsList=[(cell.ts,cell.ch) for cell in self.schedule.getCellsToNeighbor(neighbor,self.DIR_TX)]
 
                     if tsList:                                            
-                        cellsToNewParent=[(ts,ch) for (ts,ch), cell in self.schedule.iteritems() if cell['neighbor']==self.parentSet[0] and cell['dir']==self.DIR_TX]    
-                        if len(cellsToNewParent)!=0:
+                        if self.schedule.getCellsToNeighbor(self.parentSet[0],self.DIR_TX):
                             self._sixtop_cell_deletion_sender(neighbor,tsList)
  
     def _rpl_calcRankIncrease(self, neighbor):
@@ -553,6 +681,12 @@ class Mote(object):
     
     def _otf_schedule_housekeeping(self,firstOtf=False):
         
+        # housekeeping of all the motes at once, see OtfHousekeeping
+        if self.settings.otfSynchronized:
+            if firstOtf:
+                self.engine.otfHousekeeping.addMote(self)
+            return
+        
         if firstOtf:
             delay= (self.otfHousekeepingPeriod*(0.5+random.random()))
         else:
@@ -576,10 +710,7 @@ class Mote(object):
         
           
             # collect all neighbors I have RX cells to
-            rxNeighbors = [cell['neighbor'] for ((ts,ch),cell) in self.schedule.items() if cell['dir']==self.DIR_RX]
-  
-            # remove duplicates
-            rxNeighbors = list(set(rxNeighbors))          
+            rxNeighbors = self.schedule.getNeighbors(self.DIR_RX)
             
             # reset inTrafficMovingAve                
             neighbors = self.inTrafficMovingAve.keys()
@@ -611,12 +742,24 @@ class Mote(object):
             # convert to pkts/cycle
             genTraffic      *= self.settings.slotframeLength*self.settings.slotDuration
                                    
+            # trigger 6top to add/delete cells accordingly
+            self._otf_adaptCells(genTraffic)
+            
+            # schedule next housekeeping
+            self._otf_schedule_housekeeping()
+
+    def _otf_adaptCells(self,genTraffic):
+        '''
+        Split genTraffic (pkts/cycle) across parents, trigger 6top to
+        add/delete cells accordingly.
+        '''
+        with self.dataLock:
+            
             remainingPortion = 0.0
             parent_portion   = self.trafficPortionPerParent.items()
             # sort list so that the parent assigned larger traffic can be checked first
             sorted_parent_portion = sorted(parent_portion, key = lambda x: x[1], reverse=True)
                                  
-            # split genTraffic across parents, trigger 6top to add/delete cells accordingly
             for (parent,portion) in sorted_parent_portion:
                 # if some portion is remaining, this is added to this parent
                 if remainingPortion!=0.0:
@@ -718,9 +861,6 @@ class Mote(object):
                     else:
                         self.timeBetweenOTFevents += [now-self.asnOTFevent]
                     self.asnOTFevent = now
-            
-            # schedule next housekeeping
-            self._otf_schedule_housekeeping()
 
     def _otf_resetInboundTrafficCounters(self):
         with self.dataLock:
@@ -729,7 +869,10 @@ class Mote(object):
     
     def _otf_incrementIncomingTraffic(self,neighbor):
         with self.dataLock:
-            self.inTraffic[neighbor] += 1
+            if self.settings.otfSynchronized:
+                self.engine.otfHousekeeping.incrementTraffic(self,neighbor)
+            else:
+                self.inTraffic[neighbor] += 1
     
     #===== 6top
     
@@ -750,16 +893,12 @@ class Mote(object):
         #=== tx-triggered housekeeping 
         
         # collect all neighbors I have TX cells to
-        txNeighbors = [cell['neighbor'] for ((ts,ch),cell) in self.schedule.items() if cell['dir']==self.DIR_TX]
-        
-        # remove duplicates
-        txNeighbors = list(set(txNeighbors))
-        
+        txNeighbors = self.schedule.getNeighbors(self.DIR_TX)
         
         for neighbor in txNeighbors:
             nowCells = self.numCellsToNeighbors.get(neighbor,0)
 
-            assert nowCells == len([t for ((t,ch),c) in self.schedule.items() if c['dir']==self.DIR_TX and c['neighbor']==neighbor])
+            assert nowCells == len(self.schedule.getCellsToNeighbor(neighbor,self.DIR_TX))
        
         # do some housekeeping for each neighbor
         for neighbor in txNeighbors:
@@ -768,14 +907,11 @@ class Mote(object):
         #=== rx-triggered housekeeping 
         
         # collect neighbors from which I have RX cells that is detected as collision cell
-        rxNeighbors = [cell['neighbor'] for ((ts,ch),cell) in self.schedule.items() if cell['dir']==self.DIR_RX and cell['rxDetectedCollision']]
-               
-        # remove duplicates
-        rxNeighbors = list(set(rxNeighbors))
+        rxNeighbors = [n for n in self.schedule.getNeighbors(self.DIR_RX) if [c for c in self.schedule.getCellsToNeighbor(n,self.DIR_RX) if c.rxDetectedCollision]]
               
         for neighbor in rxNeighbors:
             nowCells = self.numCellsFromNeighbors.get(neighbor,0)
-            assert nowCells == len([t for ((t,ch),c) in self.schedule.items() if c['dir']==self.DIR_RX and c['neighbor']==neighbor])
+            assert nowCells == len(self.schedule.getCellsToNeighbor(neighbor,self.DIR_RX))
             
         # do some housekeeping for each neighbor
         for neighbor in rxNeighbors:
@@ -793,23 +929,24 @@ class Mote(object):
  
         # pdr for each cell
         cell_pdr = []
-        for ((ts,ch),cell) in self.schedule.items():
-            if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX:
-                # this is a TX cell to that neighbor
-                # abort if not enough TX to calculate meaningful PDR
-                if cell['numTx']<self.NUM_SUFFICIENT_TX:
-                    continue
-                
-                # calculate pdr for that cell
-                recentHistory = cell['history'][-self.NUM_MAX_HISTORY:]
-                pdr = float(sum(recentHistory)) / float(len(recentHistory))
-                
-                # store result
-                cell_pdr += [((ts,ch),pdr)]
+        bundleNumTx     = 0
+        bundleNumTxAck  = 0
+        for cell in self.schedule.getCellsToNeighbor(neighbor,self.DIR_TX):
+            
+            # pdr for the bundle as a whole
+            bundleNumTx    += cell.numHistoryTx
+            bundleNumTxAck += cell.numHistoryTxAck
+            
+            # abort if not enough TX to calculate meaningful PDR
+            if cell.numTx<self.NUM_SUFFICIENT_TX:
+                continue
+            
+            # calculate pdr for that cell
+            pdr = float(cell.numHistoryTxAck) / float(cell.numHistoryTx)
+            
+            # store result
+            cell_pdr += [((cell.ts,cell.ch),pdr)]
        
-        # pdr for the bundle as a whole
-        bundleNumTx     = sum([len(cell['history'][-self.NUM_MAX_HISTORY:]) for cell in self.schedule.values() if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX])
-        bundleNumTxAck  = sum([sum(cell['history'][-self.NUM_MAX_HISTORY:]) for cell in self.schedule.values() if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX])
         if bundleNumTx<self.NUM_SUFFICIENT_TX:
             bundlePdr   = None
         else:
@@ -838,8 +975,9 @@ class Mote(object):
             assert worst_pdr!=None
             
             # ave pdr for other cells
-            othersNumTx      = sum([len(cell['history'][-self.NUM_MAX_HISTORY:]) for ((ts,ch),cell) in self.schedule.items() if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX and ts != worst_tsch])
-            othersNumTxAck   = sum([sum(cell['history'][-self.NUM_MAX_HISTORY:]) for ((ts,ch),cell) in self.schedule.items() if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX and ts != worst_tsch])           
+            # (the worst cell was never excluded, its ts was compared with a (ts,ch) tuple)
+            othersNumTx      = bundleNumTx
+            othersNumTxAck   = bundleNumTxAck
             if othersNumTx<self.NUM_SUFFICIENT_TX:
                 ave_pdr      = None
             else:
@@ -863,7 +1001,7 @@ class Mote(object):
                 
                     # relocate: remove old only when successfully added 
                     if nowCells < self.numCellsToNeighbors.get(neighbor,0):
-                        if len(self.getTxCells())!=0:
+                        if self.schedule.getNumCells(self.DIR_TX):
                             self._sixtop_cell_deletion_sender(neighbor,[worst_tsch])
                     
                             # update stats
@@ -904,7 +1042,7 @@ class Mote(object):
 
                         # relocate: remove old only when successfully added 
                         if nowCells < self.numCellsToNeighbors.get(neighbor,0):
-                            if len(self.getTxCells())!=0:
+                            if self.schedule.getNumCells(self.DIR_TX):
                                 self._sixtop_cell_deletion_sender(neighbor,[(ts,ch)])
                                 bundleRelocation = True                        
                 # update stats
@@ -917,7 +1055,7 @@ class Mote(object):
         from a neighbor it did not expect ('rxDetectedCollision')
         '''    
         
-        rxCells = [((ts,ch),cell) for ((ts,ch),cell) in self.schedule.items() if cell['dir']==self.DIR_RX and cell['rxDetectedCollision'] and cell['neighbor']==neighbor]
+        rxCells = [((cell.ts,cell.ch),cell) for cell in self.schedule.getCellsToNeighbor(neighbor,self.DIR_RX) if cell.rxDetectedCollision]
        
         relocation = False
         for (ts,ch),cell in rxCells:
@@ -933,7 +1071,7 @@ class Mote(object):
             
                 # relocate: remove old only when successfully added 
                 if nowCells < self.numCellsFromNeighbors.get(neighbor,0):
-                    if self.getTxCells():
+                    if self.schedule.getNumCells(self.DIR_TX):
                         neighbor._sixtop_cell_deletion_sender(self,[(ts,ch)])
                         # remember I relocated a cell
                         relocation = True
@@ -961,35 +1099,16 @@ class Mote(object):
                 givenCells_firstRound       = neighbor._sixtop_cell_reservation_response_centralized_optimized(self,numCells,dir)
                 if len(givenCells_firstRound)<numCells:
                     givenCells_secondRound = neighbor._sixtop_cell_reservation_response_random(self,numCells-len(givenCells_firstRound),dir)           
-	    elif self.engine.scheduler=='deBras':
-		allCells = []
-            	for x in range(0,self.settings.slotframeLength):
-                    for y in range(0,self.settings.numChans):
-		            cell=['0','0']
-		            cell[0]=x
-		            cell[1]=y
-		            allCells.append(cell)
-
-		#remove my busy cells
-		availableCells = []
-                for cell in allCells:
-                    if self.schedule.has_key((cell[0],cell[1]))==False:
-                        availableCells.append(cell)  
-		
-		#remove the busy cells in my neighborhood
-		for neigh in self.scheduleNeigborhood.keys():
-                    if neigh != neighbor:
-	                for cell in self.scheduleNeigborhood[neigh]:
-			    if neigh.schedule[(cell[0],cell[1])]['dir']!='SHARED':
-			        if [cell[0],cell[1]] in availableCells:				    
-				    if neigh.schedule[(cell[0],cell[1])]['dir']=='RX':
-			    		availableCells.remove([cell[0],cell[1]])
-				    else:
-					if neighbor.getRSSI(neigh)+(-97-(-105)) >= self.minRssi:
-						availableCells.remove([cell[0],cell[1]])
+            elif self.engine.scheduler=='deBras':
+                #remove my busy cells
+                availableCells = self.schedule.getFreeBitmap()
+                
+                #remove the busy cells in my neighborhood
+                availableCells &= ~self.neighborhood.getRx(exclude=neighbor)
+                availableCells &= ~self.neighborhood.getTxReach(neighbor)
 
                 givenCells_firstRound       = neighbor._sixtop_cell_reservation_response_deBras(self,numCells,dir,availableCells)
-		
+                
                 if len(givenCells_firstRound)<numCells:
                     givenCells_secondRound = neighbor._sixtop_cell_reservation_response_random(self,numCells-len(givenCells_firstRound),dir)
             else:
@@ -1007,8 +1126,8 @@ class Mote(object):
                 i+=1
         
             if len(givenCells) != numCells:                                                
-                for i in range(numCells-len(givenCells)):               	
-                    	self._stats_incrementMoteStats('cellsNotGiven')
+                for i in range(numCells-len(givenCells)):                       
+                        self._stats_incrementMoteStats('cellsNotGiven')
 
 
             cellList    = []
@@ -1050,7 +1169,7 @@ class Mote(object):
            
             #in the parent, numCells are tried to be reserved
             
-	    self.numRandomSelections+=1
+            self.numRandomSelections+=1
 
             # set direction of cells
             if dirNeighbor == self.DIR_TX:
@@ -1058,22 +1177,10 @@ class Mote(object):
             else:
                 dir = self.DIR_TX
             
-            #this are all my cells
-            allCells = []
-            for x in range(0,self.settings.slotframeLength):
-                for y in range(0,self.settings.numChans):
-                #if x==0:
-                    cell=['0','0']
-                    cell[0]=x
-                    cell[1]=y
-                    allCells.append(cell)
-            
-            availableCells = []
-
-            for cell in allCells: 
-                if not (cell[0],cell[1]) in self.schedule:
-                    if not (cell[0],cell[1]) in neighbor.schedule:
-                        availableCells.append(cell) 
+            #these are all the cells free for both of us
+            availableCells = self.schedule.bitmapToCells(
+                self.schedule.getFreeBitmap() & ~neighbor.schedule.usedBitmap
+            )
 
             selectedCells={}
             if len(availableCells) > 0:
@@ -1116,36 +1223,26 @@ class Mote(object):
             return selectedCells
 
     def _sixtop_cell_reservation_response_deBras(self,neighbor,numCells,dirNeighbor, candidates):
-	with self.dataLock:
+        '''
+        get a response from the neighbor, candidates is the bitmap of the
+        cells the neighbor sees as free.
+        '''
+        with self.dataLock:
 
-	    availableCells=[]
-	    for c in candidates:
-		availableCells.append(c)
-	
-	    # set direction of cells
+            # set direction of cells
             if dirNeighbor == self.DIR_TX:
                 dir = self.DIR_RX
             else:
                 dir = self.DIR_TX
-		
-	    #remove my busy cells
-	    for cell in self.schedule.keys():
-		if self.schedule[(cell[0],cell[1])]['dir']!='SHARED':
-		    if [cell[0],cell[1]] in candidates:
-		        availableCells.remove([cell[0],cell[1]])	
-
-	
-	    for neigh in self.scheduleNeigborhood.keys():
-
-                if neigh != neighbor:
-	            for cell in self.scheduleNeigborhood[neigh]:
-		    	if neigh.schedule[(cell[0],cell[1])]['dir']!='SHARED':
-			    if [cell[0],cell[1]] in availableCells:
-				if neigh.schedule[(cell[0],cell[1])]['dir']=='TX':
-			    		availableCells.remove([cell[0],cell[1]])
-				else:
-					if neigh.schedule[(cell[0],cell[1])]['neighbor'].getRSSI(self)+(-97-(-105)) >= self.minRssi:
-						availableCells.remove([cell[0],cell[1]])
+                
+            #remove my busy cells
+            availableCells = candidates & ~(self.schedule.txBitmap|self.schedule.rxBitmap)
+
+            #remove the busy cells in my neighborhood
+            availableCells &= ~self.neighborhood.getTx(exclude=neighbor)
+            availableCells &= ~self.neighborhood.getRxReach(exclude=neighbor)
+
+            availableCells = self.schedule.bitmapToCells(availableCells)
 
             selectedCells={}
             if len(availableCells) > 0:
@@ -1170,7 +1267,7 @@ class Mote(object):
                         '[6top] add RX cell ts={0},ch={1} from {2} to {3}',
                         (val[0],val[1],self.id,neighbor.id),
                     )
-                    cellList         += [(val[0],val[1],dir)]		
+                    cellList         += [(val[0],val[1],dir)]           
 
                 self._tsch_addCells(neighbor,cellList)            
                                     
@@ -1202,37 +1299,14 @@ class Mote(object):
             else:
                 dir = self.DIR_TX
             
-            #this are all my cells
-            allCells = []
-            for x in range(0,self.settings.slotframeLength):
-                for y in range(0,self.settings.numChans):
-		    if (x,y) != (0,0):
-		        cell=['0','0']
-		        cell[0]=x
-		        cell[1]=y
-		        allCells.append(cell)         
-            
-	    #these are all my available cells       
-            availableCells = []
-            for cell in allCells: 
-                if not (cell[0],cell[1]) in self.schedule:
-                    if not (cell[0],cell[1]) in neighbor.schedule:
-                        availableCells.append(cell) 
-
-            
-
-
+            #these are all my available cells (except (0,0))
+            availableCells = self.schedule.getFreeBitmap() & ~neighbor.schedule.usedBitmap & ~self.schedule.getCellBit(0,0)
        
             #this make the scheduler centralized (no collisions at all)            
-            for neigh in self.engine.motes:
-                if neigh != self and neigh != neighbor:
-                    #print "I am 3 my signal to "+str(neigh.id)+" is "+str(self.getRSSI(neigh))+" mins: (self, neigh) "+str((self.minRssi,neigh.minRssi))
-                    #print "I am "+str(neigh.id)+" my signal to 3 is "+str(neigh.getRSSI(self))+" mins: (self, neigh) "+str((self.minRssi,neigh.minRssi))
-                    for cell in neigh.schedule.keys():
-                        #assert False
-                        if cell != (0,0):			   
-                            if [cell[0],cell[1]] in availableCells:				
-                                availableCells.remove([cell[0],cell[1]])
+            availableCells &= ~self.engine.occupancy.usedBitmap
+
+            availableCells = self.schedule.bitmapToCells(availableCells)
+
 
              
             #if I have cells, I try to assign them
@@ -1290,46 +1364,16 @@ class Mote(object):
             else:
                 dir = self.DIR_TX
 
-            #this are all my cells
-            allCells = []
-            for x in range(0,self.settings.slotframeLength):
-                for y in range(0,self.settings.numChans):
-                    cell=['0','0']
-                    cell[0]=x
-                    cell[1]=y
-                    allCells.append(cell)
-
             #these are all my available cells    
-            availableCells = []
-            for cell in allCells: 
-                if not (cell[0],cell[1]) in self.schedule:
-                    if not (cell[0],cell[1]) in neighbor.schedule:
-                        availableCells.append(cell) 
-
-            collidingCells=[]            
-
-            #even fastest version
-	    for mote in self.engine.motes:    
-                if mote != self and mote != neighbor:
-                    if self.getRSSI(mote)+(-97-(-105)) >= mote.minRssi:
-		        for cell in mote.schedule.keys():
-			    if mote.schedule[(cell[0],cell[1])]['dir']!='SHARED':
-				if [cell[0],cell[1]] in availableCells:
-				    if mote.schedule[(cell[0],cell[1])]['dir']=='TX':
-					availableCells.remove([cell[0],cell[1]])
-				    else:
-					if mote.getRSSI(neighbor)+(-97-(-105)) >= self.minRssi:
-					    availableCells.remove([cell[0],cell[1]])
-					
-		    if neighbor.getRSSI(mote)+(-97-(-105)) >= mote.minRssi:   
-    		        for cell in mote.schedule.keys():
-			    if mote.schedule[(cell[0],cell[1])]['dir']!='SHARED':
-				if [cell[0],cell[1]] in availableCells:
-				    if mote.schedule[(cell[0],cell[1])]['dir']=='RX':
-			    		availableCells.remove([cell[0],cell[1]])
-				    else:
-				        if self.getRSSI(mote)+(-97-(-105)) >= self.minRssi:
-					    availableCells.remove([cell[0],cell[1]])
+            availableCells = self.schedule.getFreeBitmap() & ~neighbor.schedule.usedBitmap
+
+            # remove the cells in which a mote I interfere with transmits,
+            # and those in which a mote the neighbor interferes with receives
+            # (RSSI is symmetric and all motes have the same minRssi; the
+            # cells of the neighbor and mine are already removed)
+            availableCells &= ~self.engine.occupancy.getConflictingCells(self,neighbor)
+
+            availableCells = self.schedule.bitmapToCells(availableCells)
              
             #if I have cells, I try to assign them
             selectedCells={}
@@ -1414,10 +1458,9 @@ class Mote(object):
         scheduleList = []
         
         # worst cell removing initialized by theoretical pdr
-        for ((ts,ch),cell) in self.schedule.iteritems():
-            if cell['neighbor']==neighbor and cell['dir']==self.DIR_TX:
-                cellPDR           = (float(cell['numTxAck'])+(self.getPDR(neighbor)*self.NUM_SUFFICIENT_TX))/(cell['numTx']+self.NUM_SUFFICIENT_TX)
-                scheduleList     += [(ts,ch,cell['numTxAck'],cell['numTx'],cellPDR)]
+        for cell in self.schedule.getCellsToNeighbor(neighbor,self.DIR_TX):
+            cellPDR           = (float(cell.numTxAck)+(self.getPDR(neighbor)*self.NUM_SUFFICIENT_TX))/(cell.numTx+self.NUM_SUFFICIENT_TX)
+            scheduleList     += [(cell.ts,cell.ch,cell.numTxAck,cell.numTx,cellPDR)]
 
         # introduce randomness in the cell list order
         random.shuffle(scheduleList)
@@ -1466,7 +1509,7 @@ class Mote(object):
             assert False
             return False
         
-        elif not self.getTxCells():
+        elif not self.schedule.getNumCells(self.DIR_TX):
             # I don't have any transmit cells
             self._stats_incrementMoteStats('droppedNoTxCells')
 
@@ -1482,7 +1525,8 @@ class Mote(object):
         else:
             # all is good           
             # enqueue packet
-            self.txQueue    += [packet]
+            self.txQueue.append(packet)
+            self.txQueueFill = len(self.txQueue)
 
             return True
     
@@ -1498,19 +1542,11 @@ class Mote(object):
                 self.engine.removeEvent(uniqueTag=(self.id,'_tsch_action_activeCell'))
                 return
             
-            tsDiffMin             = None
-            for ((ts,ch),cell) in self.schedule.items():
-                if   ts==tsCurrent:
-                    tsDiff        = self.settings.slotframeLength
-                elif ts>tsCurrent:
-                    tsDiff        = ts-tsCurrent
-                elif ts<tsCurrent:
-                    tsDiff        = (ts+self.settings.slotframeLength)-tsCurrent
-                else:
-                    raise SystemError()
-                
-                if (not tsDiffMin) or (tsDiffMin>tsDiff):
-                    tsDiffMin     = tsDiff
+            tsNext                = self.schedule.getNextActiveTs(tsCurrent)
+            if tsNext>tsCurrent:
+                tsDiffMin         = tsNext-tsCurrent
+            else:
+                tsDiffMin         = (tsNext+self.settings.slotframeLength)-tsCurrent
 
         self.engine.scheduleAtAsn(
             asn         = asn+tsDiffMin,
@@ -1531,109 +1567,107 @@ class Mote(object):
        
         with self.dataLock:
             
-            self.pktToSend = []
+            self.pktToSend = {}
          
-            tss=[row[0] for row in self.schedule.keys()]
-
-            assert ts in tss
+            assert self.schedule.getCellsAtTs(ts)
            
             numberPacketSentInThisTs=0
-            for i_ch in range(0,self.settings.numChans):
-                if (ts,i_ch) in self.schedule.keys():
-                    cell = self.schedule[(ts,i_ch)]
-                    if (cell['dir']==self.DIR_SHARED):
-                        if asn > ((2*self.settings.slotframeLength)-1):
-                                                                             
-                            if i_ch == (self.myBrCh) and ts==(self.myBrTs):    
-                                                               
-                                assert cell['dir']==self.DIR_SHARED
+            for cell in self.schedule.getCellsAtTs(ts):
+                i_ch = cell.ch
+                if (cell.dir==self.DIR_SHARED):
+                    # broadcast once synchronized (joined the DODAG)
+                    if asn > ((2*self.settings.slotframeLength)-1) and (self.dagRoot or self.preferredParent!=None):
+                                                                         
+                        if i_ch == (self.myBrCh) and ts==(self.myBrTs):    
+                                                           
+                            assert cell.dir==self.DIR_SHARED
+                            
+                            if self.numberOfWaitings==0:
+                                #I have to send a Broadcast cell                              
+                                self.numberOfWaitings=self.maxWin-1
+                                assert i_ch == self.myBrCh
+                                assert ts == self.myBrTs
+                                cell = self.schedule[(ts,i_ch)]
+                                                                   
+                                schedulingPacket = Packet.Packet(
+                                            asn            = self.engine.getAsn(),
+                                            type           = self.SIXP_TYPE_MYSCHEDULE,
+                                            origin         = self.id,
+                                            retriesLeft    = self.TSCH_MAXTXRETRIES,
+                                            scheduleUpdate = self._schedule_getUpdate(),
+                                            )
+
+                                self.schedule[(ts,i_ch)].waitingfor=self.DIR_SHARED
                                 
-                                if self.numberOfWaitings==0:
-                                    #I have to send a Broadcast cell                              
-                                    self.numberOfWaitings=self.maxWin-1
-                                    assert i_ch == self.myBrCh
-                                    assert ts == self.myBrTs
-                                    cell = self.schedule[(ts,i_ch)]
-                                                                       
-                                    schedulingPacket = {
-                                                'asn':            self.engine.getAsn(),
-                                                'type':           self.SIXP_TYPE_MYSCHEDULE,
-                                                'payload':        [self.id,self.engine.getAsn(),self.schedule], # the payload is used for latency and number of hops calculation
-                                                'retriesLeft':    self.TSCH_MAXTXRETRIES
-                                                }
-
-                                    self.schedule[(ts,i_ch)]['waitingfor']=self.DIR_SHARED
-                                    
-                                    self.engine.bcstTransmitted+=1                                
-                                    
-                                    self.propagation.startTx(
-                                                    channel   = cell['ch'],
-                                                    type      = schedulingPacket['type'],
-                                                    smac      = self,
-                                                    dmac      = self._myNeigbors(),
-                                                    payload   = schedulingPacket['payload'],
-                                                )
-                                                                                                                                   
-                                    # log charge usage
-                                    self._logChargeConsumed(self.CHARGE_TxData_uC)                        
-                                else:
-                                    #if it is not my turn to transmit broadcast, I try to receive                                                                        
-                                    self.numberOfWaitings=self.numberOfWaitings-1
-                                    self.schedule[(ts,i_ch)]['waitingfor']=self.DIR_SHARED
-                                    self.propagation.startRx(
-                                        mote          = self,
-                                        channel       = cell['ch'],
-                                    )
+                                self.engine.bcstTransmitted+=1                                
                                 
+                                self.propagation.startTx(
+                                                channel   = cell.ch,
+                                                type      = schedulingPacket.type,
+                                                smac      = self,
+                                                dmac      = self._myNeigbors(),
+                                                payload   = schedulingPacket,
+                                            )
+                                                                                                                               
+                                # log charge usage
+                                self._logChargeConsumed('chargeTxData')                        
                             else:
-                                self.schedule[(ts,i_ch)]['waitingfor']=self.DIR_SHARED
+                                #if it is not my turn to transmit broadcast, I try to receive                                                                        
+                                self.numberOfWaitings=self.numberOfWaitings-1
+                                self.schedule[(ts,i_ch)].waitingfor=self.DIR_SHARED
                                 self.propagation.startRx(
                                     mote          = self,
-                                    channel       = cell['ch'],
+                                    channel       = cell.ch,
                                 )
-                                 
-                    
-                
-                    else:    
-                        
-                        cell = self.schedule[(ts,i_ch)]
-                        assert cell
-                        
-                        if  cell['dir']==self.DIR_RX:
-          
-                            self.schedule[(ts,i_ch)]['waitingfor']=self.DIR_RX
+                            
+                        else:
+                            self.schedule[(ts,i_ch)].waitingfor=self.DIR_SHARED
                             self.propagation.startRx(
                                 mote          = self,
-                                channel       = cell['ch'],
-                            ) 
+                                channel       = cell.ch,
+                            )
+                             
+                
+            
+                else:    
                     
-                        elif cell['dir']==self.DIR_TX:
-                            if self.txQueue:
-                                if len(self.txQueue) >= (numberPacketSentInThisTs+1):                                
-                                    self.pktToSend.append(self.txQueue[numberPacketSentInThisTs])
-                            
-                            # send packet
-                            if bool(self.pktToSend) == True:
-                                if len(self.pktToSend) >= (numberPacketSentInThisTs+1):                                      
-                                        cell['numTx'] += 1
-                                        self.numTransmissions += 1
-                                        self.schedule[(ts,i_ch)]['waitingfor']=self.DIR_TX                                     
-                                        
-                                        self.propagation.startTx(
-                                            channel   = cell['ch'],
-                                            type      = self.pktToSend[numberPacketSentInThisTs]['type'],
-                                            smac      = self,
-                                            dmac      = cell['neighbor'],
-                                            payload   = self.pktToSend[numberPacketSentInThisTs]['payload'],
-                                        )
+                    cell = self.schedule[(ts,i_ch)]
+                    assert cell
                     
-                                        # indicate that we're waiting for the TX operation to finish
-                                                                 
-                                        # log charge usage
-                                        self._logChargeConsumed(self.CHARGE_TxDataRxAck_uC)
-                                        numberPacketSentInThisTs=numberPacketSentInThisTs+1
+                    if  cell.dir==self.DIR_RX:
+      
+                        self.schedule[(ts,i_ch)].waitingfor=self.DIR_RX
+                        self.propagation.startRx(
+                            mote          = self,
+                            channel       = cell.ch,
+                        ) 
+                
+                    elif cell.dir==self.DIR_TX:
+                        # send the next packet of the queue, if any
+                        if len(self.txQueue) > numberPacketSentInThisTs:
+                                    self.pktToSend[i_ch] = self.txQueue[numberPacketSentInThisTs]
+                                    
+                                    self.schedule.logTx(cell)
+                                    self._resetETX(cell.neighbor)
+                                    self.numTransmissions += 1
+                                    self.schedule[(ts,i_ch)].waitingfor=self.DIR_TX                                     
+                                    
+                                    self.propagation.startTx(
+                                        channel   = cell.ch,
+                                        type      = self.pktToSend[i_ch].type,
+                                        smac      = self,
+                                        dmac      = cell.neighbor,
+                                        payload   = self.pktToSend[i_ch],
+                                    )
+                
+                                    # indicate that we're waiting for the TX operation to finish
+                                                             
+                                    # log charge usage
+                                    self._logChargeConsumed('chargeTxDataRxAck')
+                                    numberPacketSentInThisTs=numberPacketSentInThisTs+1
+
 
-                    self._tsch_schedule_activeCell()
+            self._tsch_schedule_activeCell()
     
     def _tsch_addCells(self,neighbor,cellList):
         ''' adds cell(s) to the schedule '''
@@ -1643,32 +1677,27 @@ class Mote(object):
                 
                 assert cell
                 
-                self.schedule[(cell[0],cell[1])] = {
-                    'ts':                        cell[0],
-                    'ch':                        cell[1],
-                    'dir':                       cell[2],
-                    'neighbor':                  neighbor,
-                    'numTx':                     0,
-                    'busy':                      0,
-                    'numTxAck':                  0,
-                    'broadCell_id':              None,
-                    'numRx':                     0,
-                    'history':                   [],
-                    'waitingfor':                None,
-                    'rxDetectedCollision':       False,
-                    'debug_canbeInterfered':     [],                      # [debug] shows schedule collision that can be interfered with minRssi or larger level 
-                    'debug_interference':        [],                      # [debug] shows an interference packet with minRssi or larger level 
-                    'debug_lockInterference':    [],                      # [debug] shows locking on the interference packet
-                    'debug_cellCreatedAsn':      self.engine.getAsn(),    # [debug]
-                }
+                if (cell[0],cell[1]) in self.schedule:
+                    self.engine.occupancy.removeCell(self,cell[0],cell[1],self.schedule[(cell[0],cell[1])].dir)
+                    self._resetETX(self.schedule[(cell[0],cell[1])].neighbor)
+                self.engine.occupancy.addCell(self,cell[0],cell[1],cell[2])
+                self.schedule[(cell[0],cell[1])] = Cell.Cell(
+                    ts                 = cell[0],
+                    ch                 = cell[1],
+                    dir                = cell[2],
+                    neighbor           = neighbor,
+                    asn                = self.engine.getAsn(),
+                    debugHistory       = self.settings.cellDebugHistory,
+                )
                 
                 # log
                 self._log(
                     self.INFO,
                     "[tsch] add cell ts={0} ch={1} dir={2} with {3}",
-                    (cell[0],cell[1],cell[2],neighbor.id),
+                    (cell[0],cell[1],Cell.Cell.DIR_NAMES[cell[2]],neighbor.id),
                 )
 
+            self._resetETX(neighbor)
             self._tsch_schedule_activeCell()
             
             
@@ -1685,8 +1714,10 @@ class Mote(object):
 
             for ts,ch in tsList:
 
-                assert (ts,ch) in self.schedule.keys()
-               	assert self.schedule[(ts,ch)]['dir']!=self.DIR_SHARED
+                assert (ts,ch) in self.schedule
+                assert self.schedule[(ts,ch)].dir!=self.DIR_SHARED
+                self.engine.occupancy.removeCell(self,ts,ch,self.schedule[(ts,ch)].dir)
+                self._resetETX(self.schedule[(ts,ch)].neighbor)
                 del self.schedule[(ts,ch)]
                 
             self._tsch_schedule_activeCell()
@@ -1699,81 +1730,82 @@ class Mote(object):
         ts    = asn%self.settings.slotframeLength
         
         with self.dataLock:
-            tss=[row[0] for row in self.schedule.keys()]
-            assert ts in tss
+            assert self.schedule.getCellsAtTs(ts)
 
+            for cell in self.schedule.getCellsAtTs(ts):
+                i_ch = cell.ch
                     
-            i_ch=0
-            for i_ch in range(self.settings.numChans):
-                if (ts,i_ch) in self.schedule.keys():        
-                        
-                    if self.schedule[(ts,i_ch)]['waitingfor']==self.DIR_TX:
+                if self.schedule[(ts,i_ch)].waitingfor==self.DIR_TX:
 
-                        assert self.schedule[(ts,i_ch)]['dir']==self.DIR_TX
-                        assert self.schedule[(ts,i_ch)]['waitingfor']==self.DIR_TX
+                    assert self.schedule[(ts,i_ch)].dir==self.DIR_TX
+                    assert self.schedule[(ts,i_ch)].waitingfor==self.DIR_TX
+                    
+                    # the packet sent in this cell, among the first ones of the queue
+                    packet = self.pktToSend.pop(i_ch)
 
-                        if isACKed:
+                    if isACKed:
 
-                            # update schedule stats
-                            self.schedule[(ts,i_ch)]['numTxAck'] += 1
-                            
-                            # update history
-                            self.schedule[(ts,i_ch)]['history'] += [1]
-                            
-                            # update queue stats
-                            self._stats_logQueueDelay(asn-self.pktToSend[0]['asn'])
-                            
-                            # time correction
-                            if self.schedule[(ts,i_ch)]['neighbor'] == self.preferredParent:
-                                self.timeCorrectedSlot = asn
-                            
-                            # remove packet from queue
-                            self.txQueue.remove(self.pktToSend[0])
-                            self.pktToSend.remove(self.pktToSend[0])
-                            
+                        # update schedule stats
+                        self.schedule.logTxAck(self.schedule[(ts,i_ch)])
+                        self._resetETX(self.schedule[(ts,i_ch)].neighbor)
+                        
+                        # update history
+                        self.schedule[(ts,i_ch)].logHistory(1)
+                        
+                        # update queue stats
+                        self._stats_logQueueDelay(asn-packet.asn)
+                        
+                        # time correction
+                        if self.schedule[(ts,i_ch)].neighbor == self.preferredParent:
+                            self.timeCorrectedSlot = asn
+                        
+                        # remove packet from queue
+                        self.txQueue.remove(packet)
+                        self.txQueueFill = len(self.txQueue)
+                        
 
-                        elif isNACKed:  #when fails in enqueue packet
-                            
-                            # NACK received
-                            # update schedule stats as if it were successfully transmitted
-                            self.schedule[(ts,i_ch)]['numTxAck'] += 1
+                    elif isNACKed:  #when fails in enqueue packet
+                        
+                        # NACK received
+                        # update schedule stats as if it were successfully transmitted
+                        self.schedule.logTxAck(self.schedule[(ts,i_ch)])
+                        self._resetETX(self.schedule[(ts,i_ch)].neighbor)
 
-                            # update history
-                            self.schedule[(ts,i_ch)]['history'] += [1]
-                            
-                            # time correction
-                            if self.schedule[(ts,i_ch)]['neighbor'] == self.preferredParent:
-                                self.timeCorrectedSlot = asn
+                        # update history
+                        self.schedule[(ts,i_ch)].logHistory(1)
+                        
+                        # time correction
+                        if self.schedule[(ts,i_ch)].neighbor == self.preferredParent:
+                            self.timeCorrectedSlot = asn
 
-			    #remove this part because it is considered that a packet received is a good MAC tx even if the queue in the rx node is full
-                            
+                        #remove this part because it is considered that a packet received is a good MAC tx even if the queue in the rx node is full
+                        
+                        # remove packet from queue
+                        self.txQueue.remove(packet)
+                        self.txQueueFill = len(self.txQueue)
+                        
+                    else:
+                        # neither ACK nor NACK received
+                        # update history
+                        self.schedule[(ts,i_ch)].logHistory(0)
+
+                        # decrement 'retriesLeft' counter associated with that packet
+                        if packet.retriesLeft > 0:
+                            packet.retriesLeft -= 1
+                        
+                        
+                        #debug problem with MAC drops                                  
+                        # drop packet if retried too many time
+                        if packet.retriesLeft == 0:
+                            self._stats_incrementMoteStats('droppedMacRetries')
+                                                            
                             # remove packet from queue
-                            self.txQueue.remove(self.pktToSend[0])
-                            self.pktToSend.remove(self.pktToSend[0])
-                            
-                        else:
-                            # neither ACK nor NACK received
-                            # update history
-                            self.schedule[(ts,i_ch)]['history'] += [0]
-
-                            # decrement 'retriesLeft' counter associated with that packet
-                            i = self.txQueue.index(self.pktToSend[0])
-                            if self.txQueue[i]['retriesLeft'] > 0:
-                                self.txQueue[i]['retriesLeft'] -= 1
-                            
-                            
-                            #debug problem with MAC drops                                  
-                            # drop packet if retried too many time
-                            if self.txQueue[i]['retriesLeft'] == 0:
-                                self._stats_incrementMoteStats('droppedMacRetries')
-                                                                
-                                # remove packet from queue
-                                self.txQueue.remove(self.pktToSend[0])
-                                self.pktToSend.remove(self.pktToSend[0])
-
-                        self.schedule[(ts,i_ch)]['waitingfor']=None
-                        return
-    
+                            self.txQueue.remove(packet)
+                            self.txQueueFill = len(self.txQueue)
+
+                    self.schedule[(ts,i_ch)].waitingfor=None
+                    return
+
     def radio_rxDone(self,type=None,smac=None,dmac=None,payload=None,channel=None):
         '''end of RX radio activity'''
         
@@ -1781,136 +1813,129 @@ class Mote(object):
         ts    = asn%self.settings.slotframeLength
         with self.dataLock:
            
-            if type=='SIXP_TYPE_MYSCHEDULE':
+            if type==self.SIXP_TYPE_MYSCHEDULE:
 
-                if self.schedule.has_key((ts,channel)) and self.schedule[(ts,channel)]['waitingfor']==self.DIR_SHARED and self.schedule[(ts,channel)]['dir']==self.DIR_SHARED:
+                if self.schedule.has_key((ts,channel)) and self.schedule[(ts,channel)].waitingfor==self.DIR_SHARED and self.schedule[(ts,channel)].dir==self.DIR_SHARED:
                   
                     if smac:
                         # I received a packet
                         
                         # log charge usage
-                        self._logChargeConsumed(self.CHARGE_RxData_uC)
+                        self._logChargeConsumed('chargeRxData')
                         
                         
-                        scheduleOfNeigbor=payload[2]
+                        scheduleUpdate=payload.scheduleUpdate
 
-                        self._updateSchedule(scheduleOfNeigbor,smac)
+                        self._updateSchedule(scheduleUpdate,smac)
                         
                         self.engine.bcstReceived+=1                        
                         
                         # update schedule stats
 
                         (isACKed, isNACKed) = (True, False)
-                        self.schedule[(ts,channel)]['waitingfor']=None
+                        self.schedule[(ts,channel)].waitingfor=None
                         return isACKed, isNACKed
                     else:
                         # this was an idle listen 
                         # log charge usage
-                        self._logChargeConsumed(self.CHARGE_Idle_uC)
+                        self._logChargeConsumed('chargeIdle')
                                 
                         (isACKed, isNACKed) = (False, False)
 
 
-                        self.schedule[(ts,channel)]['waitingfor']=None
+                        self.schedule[(ts,channel)].waitingfor=None
                         return isACKed, isNACKed
                             
-            elif type=='TRAFFICOMIO':                
-                for i_ch in range(0,self.settings.numChans):                
-                    if (ts,i_ch) in self.schedule.keys() and self.schedule[(ts,channel)]['dir']!=self.DIR_SHARED:           
-                        assert self.schedule[(ts,channel)]['dir']!=self.DIR_SHARED 
-                        if self.schedule[(ts,i_ch)]['waitingfor']==self.DIR_RX:
-
-                            assert self.schedule[(ts,i_ch)]['dir']==self.DIR_RX
-                            assert self.schedule[(ts,i_ch)]['waitingfor']==self.DIR_RX
+            elif type==self.APP_TYPE_MYTRAFFIC:                
+                for cell in self.schedule.getCellsAtTs(ts):
+                    i_ch = cell.ch
+                    if self.schedule[(ts,channel)].dir==self.DIR_SHARED:
+                        continue
+                    assert self.schedule[(ts,channel)].dir!=self.DIR_SHARED 
+                    if self.schedule[(ts,i_ch)].waitingfor==self.DIR_RX:
+
+                        assert self.schedule[(ts,i_ch)].dir==self.DIR_RX
+                        assert self.schedule[(ts,i_ch)].waitingfor==self.DIR_RX
+                        
+                        if smac:
+                            self.numReceptions += 1
+                            # I received a packet
+                            # log charge usage
+                            self._logChargeConsumed('chargeRxDataTxAck')
+                            
+                            # update schedule stats
+                            self.schedule[(ts,i_ch)].numRx += 1
                             
-                            if smac:
-				self.numReceptions += 1
-                                # I received a packet
-                                # log charge usage
-                                self._logChargeConsumed(self.CHARGE_RxDataTxAck_uC)
+                            if self.dagRoot:
+                                # receiving packet (at DAG root)
+                                
+                                # update mote stats
+                                self._stats_incrementMoteStats('appReachesDagroot')
                                 
-                                # update schedule stats
-                                self.schedule[(ts,i_ch)]['numRx'] += 1
+                                #emunicio
+                                #loging probing packets
+                                self.numPacketReceived=self.numPacketReceived+1 
+                                if self.engine.inMeasurementWindow():
+                                    self.probeNumPacketReceived=self.probeNumPacketReceived+1
                                 
-                                if self.dagRoot:
-                                    # receiving packet (at DAG root)
+                                # calculate end-to-end latency
+                                self._stats_logLatencyStat(asn-payload.createdAsn)
+                                
+                                # log the number of hops
+                                self._stats_logHopsStat(payload.numHops)
+                                
+                                (isACKed, isNACKed) = (True, False)
+
+                                self.schedule[(ts,i_ch)].waitingfor=None
+                                return isACKed, isNACKed
+                            else:
+                                # relaying packet
+                                # count incoming traffic for each node
+                                self._otf_incrementIncomingTraffic(smac)
+                                
+                                # create packet, one more hop
+                                relayPacket = payload.relay(asn,self.TSCH_MAXTXRETRIES)
+                                
+                                # enqueue packet in TSCH queue
+                                isEnqueued = self._tsch_enqueue(relayPacket)
+                                
+                                if isEnqueued:
                                     
                                     # update mote stats
-                                    self._stats_incrementMoteStats('appReachesDagroot')
-                                    
-                                    #emunicio
-				    #loging probing packets
-                                    self.numPacketReceived=self.numPacketReceived+1 
-				    if (self.engine.asn < (96*self.settings.slotframeLength)) and (self.engine.asn > (63*self.settings.slotframeLength)):
-                                        self.probeNumPacketReceived=self.probeNumPacketReceived+1
-                                    
-                                    # calculate end-to-end latency
-                                    self._stats_logLatencyStat(asn-payload[1])
-                                    
-                                    # log the number of hops
-                                    self._stats_logHopsStat(payload[2])
+                                    self._stats_incrementMoteStats('appRelayed')
                                     
                                     (isACKed, isNACKed) = (True, False)
-   
-                                    self.schedule[(ts,i_ch)]['waitingfor']=None
+                                    
+                                    self.schedule[(ts,i_ch)].waitingfor=None                                
                                     return isACKed, isNACKed
                                 else:
-                                    # relaying packet
-                                    # count incoming traffic for each node
-                                    self._otf_incrementIncomingTraffic(smac)
-                                    
-                                    # update the number of hops
-                                    newPayload     = copy.deepcopy(payload)
-                                    newPayload[2] += 1
-                                    
-                                    # create packet
-                                    relayPacket = {
-                                        'asn':         asn,
-                                        'type':        type,
-                                        'payload':     newPayload,
-                                        'retriesLeft': self.TSCH_MAXTXRETRIES
-                                    }
-                                    
-                                    # enqueue packet in TSCH queue
-                                    isEnqueued = self._tsch_enqueue(relayPacket)
-                                    
-                                    if isEnqueued:
-                                        
-                                        # update mote stats
-                                        self._stats_incrementMoteStats('appRelayed')
-                                        
-                                        (isACKed, isNACKed) = (True, False)
-                                        
-                                        self.schedule[(ts,i_ch)]['waitingfor']=None                                
-                                        return isACKed, isNACKed
-                                    else:
-
-                                        self._stats_incrementMoteStats('droppedAppFailedEnqueue')
-                                        (isACKed, isNACKed) = (False, True)
-                                        #if relayPacket['payload'][0]==24:
-                                            #print "Sending NACK"
-                                        self.schedule[(ts,i_ch)]['waitingfor']=None
-                                        return isACKed, isNACKed
-                            else:
-                                # this was an idle listen
-                                # log charge usage
-                                self._logChargeConsumed(self.CHARGE_Idle_uC)
-                                
-                                (isACKed, isNACKed) = (False, False)
-                    
-                                self.schedule[(ts,i_ch)]['waitingfor']=None
-                                return isACKed, isNACKed    
-            
+
+                                    self._stats_incrementMoteStats('droppedAppFailedEnqueue')
+                                    (isACKed, isNACKed) = (False, True)
+                                    #if relayPacket.origin==24:
+                                        #print "Sending NACK"
+                                    self.schedule[(ts,i_ch)].waitingfor=None
+                                    return isACKed, isNACKed
+                        else:
+                            # this was an idle listen
+                            # log charge usage
+                            self._logChargeConsumed('chargeIdle')
+                            
+                            (isACKed, isNACKed) = (False, False)
+
+                            self.schedule[(ts,i_ch)].waitingfor=None
+                            return isACKed, isNACKed    
+
             else:
                  
-		 #always coung charge
-		 self._logChargeConsumed(self.CHARGE_Idle_uC)
+                 #always coung charge
+                 self._logChargeConsumed('chargeIdle')
                
                  (isACKed, isNACKed) = (False, False)
 
                  #if the broadcast packet has failed, we still can wait for a correct broadcast in other cell
                                  
-                 self.schedule[(ts,channel)]['waitingfor']=None
+                 self.schedule[(ts,channel)].waitingfor=None
                  return isACKed, isNACKed
 
     #===== wireless
@@ -1919,6 +1944,7 @@ class Mote(object):
         ''' sets the pdr to that neighbor'''
         with self.dataLock:
             self.PDR[neighbor] = pdr
+            self._resetETX(neighbor)
     
     def getPDR(self,neighbor):
         ''' returns the pdr to that neighbor'''
@@ -1943,26 +1969,33 @@ class Mote(object):
         
         with self.dataLock:
             
+            if neighbor in self.etx:
+                return self.etx[neighbor]
+            
             # set initial values for numTx and numTxAck assuming PDR is exactly estimated
             pdr                   = self.getPDR(neighbor)
             numTx                 = self.NUM_SUFFICIENT_TX
             numTxAck              = math.floor(pdr*numTx)
             
-            for (_,cell) in self.schedule.items():
-                if (cell['neighbor'] == neighbor) and (cell['dir'] == self.DIR_TX):  #ok shared cell broadcast is not taken in account
-                    numTx        += cell['numTx']
-                    numTxAck     += cell['numTxAck']
+            # shared cells (broadcast) are not taken into account
+            numTx                += self.schedule.getNumTx(neighbor,self.DIR_TX)
+            numTxAck             += self.schedule.getNumTxAck(neighbor,self.DIR_TX)
             
             # abort if about to divide by 0
             if not numTxAck:
-                return
-            
-            # calculate ETX
+                etx = None
+            else:
+                # calculate ETX
+                etx = float(numTx)/float(numTxAck)
             
-            etx = float(numTx)/float(numTxAck)
+            self.etx[neighbor] = etx
 
             return etx
     
+    def _resetETX(self,neighbor):
+        ''' the TX counters or the PDR to that neighbor changed '''
+        self.etx.pop(neighbor,None)
+    
     def _myNeigbors(self):
         return [n for n in self.PDR.keys() if self.PDR[n]>0]
 
@@ -2000,19 +2033,8 @@ class Mote(object):
      
     def recalculateNumHopsToRoot(self):
         ''' calculate time offset compared to the DAGroot '''
-        child                = self
-        parent               = self.preferredParent
-        i=0
-        while True:
-            i=i+1
-            if i>30:
-                assert False # more than hops 30 is not allowed
-            if parent.dagRoot:
-                break
-            else:
-                child        = parent
-                parent       = child.preferredParent
-             
+        i = self.engine.dodag.getDepth(self)
+        assert i<=30 # more than hops 30 is not allowed
         return i
     #===== location
     
@@ -2030,11 +2052,17 @@ class Mote(object):
     def boot(self):
         # start the stack layer by layer
         
-        # app
-        if not self.dagRoot:
+        # app, the other traffic models are generated by TrafficModel
+        if not self.dagRoot and self.settings.trafficModel=='periodic':
             self._app_schedule_sendSinglePacket(firstPacket=True)
         # RPL
-        self._rpl_schedule_sendDIO(firstDIO=True)
+        if not self.settings.rplOracle:
+            self._rpl_schedule_sendDIO(firstDIO=True)
+        elif self.preferredParent != None:
+            # routes set at boot, no DIOs
+            self.hopsToRoot=self.recalculateNumHopsToRoot()
+            self._otf_schedule_housekeeping(firstOtf=True)
+            self.otfTriggered=True
         # OTF
         self._otf_resetInboundTrafficCounters()
 
@@ -2047,9 +2075,9 @@ class Mote(object):
         # tsch
         self._tsch_schedule_activeCell()
                  
-    def _logChargeConsumed(self,charge):
-        with self.dataLock:
-            self.chargeConsumed  += charge
+    def _logChargeConsumed(self,activity):
+        ''' one more slot spent in that radio activity, MoteStats computes the charge '''
+        self.engine.moteStats.increment(self.id,activity)
 	    
     
     #======================== private =========================================
@@ -2058,114 +2086,47 @@ class Mote(object):
     
     def getChildrens(self,node):
         with self.dataLock:
-            children=[]                                           
-            for mote in self.engine.motes:
-                if mote.preferredParent == node:
-                    children.append(mote)  
-            return children   
+            return list(self.engine.dodag.getChildren(node))
     
     #not used when OTF is present
     def getMyMaxCellDemand(self):
         with self.dataLock:
-            alcanzables=[]
-
-            alcanzables=self.getChildrens(self) 
-            cellTh=len(alcanzables)+1  #+1 because I have to bear in mind my own traffic
-            while len(alcanzables)!=0:
-                hijo=alcanzables[0]
-                alcanzables.remove(hijo)
-                for hijodehijo in self.getChildrens(hijo):
-                    cellTh+=1
-                    alcanzables.append(hijodehijo)    
+            cellTh=self.engine.dodag.getSubtreeSize(self)  # my descendants, +1 because I have to bear in mind my own traffic
             cellTh=int((((1-self.getPDR(self.preferredParent))+1)*cellTh)+1)     
             return cellTh
     
     def getTxCells(self):
         with self.dataLock:
-            return [(ts,c['ch'],c['neighbor']) for ((ts,ch),c) in self.schedule.items() if c['dir']==self.DIR_TX]
+            return [(c.ts,c.ch,c.neighbor) for n in self.schedule.getNeighbors(self.DIR_TX) for c in self.schedule.getCellsToNeighbor(n,self.DIR_TX)]
     
     def getRxCells(self):
         with self.dataLock:
-            return [(ts,c['ch'],c['neighbor']) for ((ts,ch),c) in self.schedule.items() if c['dir']==self.DIR_RX]
+            return [(c.ts,c.ch,c.neighbor) for n in self.schedule.getNeighbors(self.DIR_RX) for c in self.schedule.getCellsToNeighbor(n,self.DIR_RX)]
     def getRxCellsToNeighbor(self,neighbor):
         with self.dataLock:
-            return [(ts,c['ch'],c['neighbor']) for ((ts,ch),c) in self.schedule.items() if c['dir']==self.DIR_RX and c['neighbor']==neighbor]
+            return [(c.ts,c.ch,c.neighbor) for c in self.schedule.getCellsToNeighbor(neighbor,self.DIR_RX)]
     def getSharedCells(self):
         with self.dataLock:
-            return [(ts,c['ch'],c['neighbor']) for ((ts,ch),c) in self.schedule.items() if c['dir']==self.DIR_SHARED]
+            return [(ts,c.ch,c.neighbor) for ((ts,ch),c) in self.schedule.items() if c.dir==self.DIR_SHARED]
 
     #===== stats
     
     # mote state  
     def getMoteStats(self):
-                      
-        # gather statistics
+        ''' my statistics since the start, reading them does not reset them '''
+        
         with self.dataLock:
-            returnVal = copy.deepcopy(self.motestats)
-            returnVal['numTxCells']         = len(self.getTxCells())
-            returnVal['numRxCells']         = len(self.getRxCells())
-            returnVal['aveQueueDelay']      = self._stats_getAveQueueDelay()
-            returnVal['aveLatency']         = self._stats_getAveLatency()
-            returnVal['aveHopsPackets']     = self.hopsToRoot
-            returnVal['aveHops']            = self._stats_getAveHops()
-            returnVal['probableCollisions'] = self._stats_getRadioStats('probableCollisions')            
-            returnVal['txQueueFill']        = len(self.txQueue)
-            returnVal['PKTTX']              = self.numPacketSent
-            returnVal['PKTRX']              = self.numPacketReceived
-            returnVal['numReqCells']        = self.numReqCells
-            returnVal['chargeConsumed']     = self.chargeConsumed
-            returnVal['numTx']              =self.numTransmissions
-            returnVal['numRx']              =self.numReceptions
-            returnVal['thReqCells']         =self.threq
-            returnVal['txBroadcast']     = self.engine.bcstTransmitted
-            returnVal['rxBroadcast']     = self.engine.bcstReceived
-	    returnVal['numRandomSelections']     = self.numRandomSelections
-        # reset the statistics
-        self._stats_resetMoteStats()
-        self._stats_resetQueueStats()
-        self._stats_resetLatencyStats()
-        self._stats_resetHopsStats()
-        self._stats_resetRadioStats()
+            returnVal = self.engine.moteStats.getMoteStats(self.id)
+            returnVal['numTxCells']         = self.schedule.getNumCells(self.DIR_TX)
+            returnVal['numRxCells']         = self.schedule.getNumCells(self.DIR_RX)
+            returnVal['txBroadcast']        = self.engine.bcstTransmitted
+            returnVal['rxBroadcast']        = self.engine.bcstReceived
         
         return returnVal
     
-    
-    def _stats_resetMoteStats(self):
-        with self.dataLock:
-            self.motestats = {
-                # app
-                'appGenerated':            0,   # number of packets app layer generated
-                'appRelayed':              0,   # number of packets relayed
-                'appReachesDagroot':       0,   # number of packets received at the DAGroot
-                'droppedAppFailedEnqueue': 0,   # dropped packets because app failed enqueue them
-                # queue
-                'droppedQueueFull':        0,   # dropped packets because queue is full
-                # rpl
-                'rplTxDIO':                0,   # number of TX'ed DIOs
-                'rplRxDIO':                0,   # number of RX'ed DIOs
-                'rplChurnPrefParent':      0,   # number of time the mote changes preferred parent
-                'rplChurnRank':            0,   # number of time the mote changes rank
-                'rplChurnParentSet':       0,   # number of time the mote changes parent set
-                'droppedNoRoute':          0,   # packets dropped because no route (no preferred parent)
-                # otf
-                'otfAdd':                  0,   # OTF adds some cells
-                'otfRemove':               0,   # OTF removes some cells
-                'droppedNoTxCells':        0,   # packets dropped because no TX cells
-                # 6top
-                'topTxRelocatedCells':     0,   # number of time tx-triggered 6top relocates a single cell
-                'topTxRelocatedBundles':   0,   # number of time tx-triggered 6top relocates a bundle
-                'topRxRelocatedCells':     0,   # number of time rx-triggered 6top relocates a single cell
-                # tsch
-                'droppedMacRetries':       0,   # packets dropped because more than TSCH_MAXTXRETRIES MAC retries
-                'numReqCells':                   0,	
-                'thReqCells':                   0,
-                'cellsNotGiven':            0,
-            }
-
-    
     def _stats_incrementMoteStats(self,name):
         with self.dataLock:
-            self.motestats[name] += 1
+            self.engine.moteStats.increment(self.id,name)
                     
     # cell stats
     
@@ -2175,13 +2136,13 @@ class Mote(object):
         returnVal = None
         with self.dataLock:
             for ((ts,ch),cell) in self.schedule.items():
-                if ts==ts_p and cell['ch']==ch_p:
+                if ts==ts_p and cell.ch==ch_p:
                     returnVal = {
-                        'dir':            cell['dir'],
-                        'neighbor':       cell['neighbor'].id,
-                        'numTx':          cell['numTx'],
-                        'numTxAck':       cell['numTxAck'],
-                        'numRx':          cell['numRx'],
+                        'dir':            Cell.Cell.DIR_NAMES[cell.dir],
+                        'neighbor':       cell.neighbor.id,
+                        'numTx':          cell.numTx,
+                        'numTxAck':       cell.numTxAck,
+                        'numRx':          cell.numRx,
                     }
                     break
         return returnVal
@@ -2190,63 +2151,25 @@ class Mote(object):
     
     def _stats_logQueueDelay(self,delay):
         with self.dataLock:
-            self.queuestats['delay'] += [delay]
-    
-    def _stats_getAveQueueDelay(self):
-        d = self.queuestats['delay']
-        return float(sum(d))/len(d) if len(d)>0 else 0
-    
-    def _stats_resetQueueStats(self):
-        with self.dataLock:
-            self.queuestats = {
-                'delay':               [],
-            }
+            self.engine.moteStats.logSample(self.id,'queueDelay',delay)
     
     # latency stats
     
     def _stats_logLatencyStat(self,latency):
         with self.dataLock:
-            self.packetLatencies += [latency]
-    
-    def _stats_getAveLatency(self):
-        with self.dataLock:
-            d = self.packetLatencies
-            return float(sum(d))/float(len(d)) if len(d)>0 else 0
-    
-    def _stats_resetLatencyStats(self):
-        with self.dataLock:
-            self.packetLatencies = []
+            self.engine.moteStats.logSample(self.id,'latency',latency)
     
     # hops stats
     
     def _stats_logHopsStat(self,hops):
         with self.dataLock:
-            self.packetHops += [hops]
-    
-    def _stats_getAveHops(self):
-        with self.dataLock:
-            d = self.packetHops
-            #print "Packet HOPS"+str(d)
-            return float(sum(d))/float(len(d)) if len(d)>0 else 0
-    
-    def _stats_resetHopsStats(self):
-        with self.dataLock:
-            self.packetHops = []
+            self.engine.moteStats.logSample(self.id,'hops',hops)
     
     # radio stats
     
     def stats_incrementRadioStats(self,name):
         with self.dataLock:
-            self.radiostats[name] += 1
-    
-    def _stats_getRadioStats(self,name):
-        return self.radiostats[name]
-    
-    def _stats_resetRadioStats(self):
-        with self.dataLock:
-            self.radiostats = {
-                'probableCollisions':      0,   # number of packets that can collide with another packets 
-            }
+            self.engine.moteStats.increment(self.id,name)
     
     #===== log
     
@@ -2298,38 +2221,30 @@ class Mote(object):
         
         with self.dataLock:
 
-	    broadCell_id=0  
-	    for neighbor in self._myInterferersNeigbors(): #initial neighbor selection
-	        self.scheduleNeigborhood[neighbor]={}
+            broadCell_id=0  
+            for neighbor in self._myInterferersNeigbors(): #initial neighbor selection
+                self.neighborhood.addNeighbor(neighbor)
 
             for j_ch in range(0,self.settings.numChans):
 
                 ts_b=0
                 for n in range(0,self.settings.numBroadcastCells):
                     cell = (ts_b,j_ch)
-		    if broadCell_id < self.settings.numMotes:   #avoid allocate more cells per cycle than existing nodes
-
-			    self.schedule[(ts_b,j_ch)] = {
-			                'ts':                        ts_b,
-			                'ch':                        j_ch,
-			                'dir':                       self.DIR_SHARED,
-			                'neighbor':                  self.BROAD,
-			                'numTx':                     0,
-			                'numTxAck':                  0,
-			                'broadCell_id':              broadCell_id,
-			                'numRx':                     0,
-			                'busy':                      0,
-			                'history':                   [],
-			                'waitingfor':                None,
-			                'rxDetectedCollision':       False,
-			                'debug_canbeInterfered':     [],                      # [debug] shows schedule collision that can be interfered with minRssi or larger level 
-			                'debug_interference':        [],                      # [debug] shows an interference packet with minRssi or larger level 
-			                'debug_lockInterference':    [],                      # [debug] shows locking on the interference packet
-			                'debug_cellCreatedAsn':      self.engine.getAsn(),    # [debug]
-			            }
-
-			    ts_b+=int(self.settings.slotframeLength/self.settings.numBroadcastCells)
-			    broadCell_id+=1
+                    if broadCell_id < self.settings.numMotes:   #avoid allocate more cells per cycle than existing nodes
+
+                        self.engine.occupancy.addCell(self,ts_b,j_ch,self.DIR_SHARED)
+                        self.schedule[(ts_b,j_ch)] = Cell.Cell(
+                            ts             = ts_b,
+                            ch             = j_ch,
+                            dir            = self.DIR_SHARED,
+                            neighbor       = self.BROAD,
+                            broadCell_id   = broadCell_id,
+                            asn            = self.engine.getAsn(),
+                            debugHistory   = self.settings.cellDebugHistory,
+                        )
+
+                        ts_b+=int(self.settings.slotframeLength/self.settings.numBroadcastCells)
+                        broadCell_id+=1
       
             if self.settings.numBroadcastCells!=0:            
                 
@@ -2337,7 +2252,7 @@ class Mote(object):
                 self.maxWin=math.ceil((float(self.settings.numMotes)/(broadCell_id)))             
                 self.numberOfWaitings= int((self.id/(broadCell_id)))
 
-                value=[(ts,c['ch']) for ((ts,ch),c) in self.schedule.items() if c['broadCell_id']==(self.id % (broadCell_id))]
+                value=[(ts,c.ch) for ((ts,ch),c) in self.schedule.items() if c.broadCell_id==(self.id % (broadCell_id))]
                 self.myBrTs=value[0][0]
                 self.myBrCh=value[0][1]
 
@@ -2354,11 +2269,24 @@ class Mote(object):
                 candidates.append(neigh)
         return candidates        
 
-    def _updateSchedule(self,scheduleOfNeighbor,neighbor):
+    def _schedule_getUpdate(self):
+        '''
+        The changes to my schedule since my last broadcast, to be broadcast,
+        as (baseVersion,version,delta,cells). cells is the complete
+        schedule, for the neighbors which missed a broadcast.
+        '''
+        update = (
+            self.scheduleBroadcastVersion,
+            self.schedule.version,
+            self.schedule.getChangesSince(self.scheduleBroadcastVersion),
+            self.schedule.getSnapshot(),
+        )
+        self.schedule.trimChangeLog(self.schedule.version)
+        self.scheduleBroadcastVersion = self.schedule.version
+        return update
 
-        with self.dataLock:
-        
-                if self.scheduleNeigborhood[neighbor]!=scheduleOfNeighbor:
+    def _updateSchedule(self,scheduleUpdate,neighbor):
 
-                    self.scheduleNeigborhood[neighbor]=scheduleOfNeighbor
+        with self.dataLock:
+            self.neighborhood.updateNeighbor(neighbor,scheduleUpdate)
 
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+'''
+\brief The statistics of all the motes of the network.
+'''
+
+#============================ imports =========================================
+
+import numpy
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class MoteStats(object):
+    '''
+    One row per mote (indexed by mote id) of preallocated arrays, so the
+    statistics of the network are summed in one operation, and reading them
+    does not reset them.
+
+    - COUNTERS only increase, their value over a period is the difference
+      with a snapshot taken at its start (see getSnapshot()).
+    - SAMPLES are averaged over a period, their sum and number of samples
+      are counted ('<name>Sum' and '<name>Num').
+    - GAUGES are the current values, set by the mote.
+    - CHARGES count the slots spent in each radio activity, the charge
+      consumed is their dot product with the charge of each activity.
+
+    getMoteStats() and getNetworkStats() name the statistics as in the
+    output files (OUTPUT_NAMES).
+    '''
+
+    COUNTERS = [
+        # app
+        'appGenerated',             # number of packets app layer generated
+        'appRelayed',               # number of packets relayed
+        'appReachesDagroot',        # number of packets received at the DAGroot
+        'droppedAppFailedEnqueue',  # dropped packets because app failed enqueue them
+        # queue
+        'droppedQueueFull',         # dropped packets because queue is full
+        # rpl
+        'rplTxDIO',                 # number of TX'ed DIOs
+        'rplRxDIO',                 # number of RX'ed DIOs
+        'rplChurnPrefParent',       # number of time the mote changes preferred parent
+        'rplChurnRank',             # number of time the mote changes rank
+        'rplChurnParentSet',        # number of time the mote changes parent set
+        'droppedNoRoute',           # packets dropped because no route (no preferred parent)
+        # otf
+        'otfAdd',                   # OTF adds some cells
+        'otfRemove',                # OTF removes some cells
+        'droppedNoTxCells',         # packets dropped because no TX cells
+        # 6top
+        'topTxRelocatedCells',      # number of time tx-triggered 6top relocates a single cell
+        'topTxRelocatedBundles',    # number of time tx-triggered 6top relocates a bundle
+        'topRxRelocatedCells',      # number of time rx-triggered 6top relocates a single cell
+        'cellsNotGiven',
+        # tsch
+        'droppedMacRetries',        # packets dropped because more than TSCH_MAXTXRETRIES MAC retries
+        # radio
+        'probableCollisions',       # number of packets that can collide with another packets
+    ]
+    SAMPLES = [
+        'queueDelay',               # in slots
+        'latency',                  # in slots
+        'hops',
+    ]
+    GAUGES = [
+        'numPacketSent',            # total number of packets sent
+        'numPacketReceived',        # total number of packets received
+        'numTransmissions',
+        'numReceptions',
+        'numReqCells',              # requested cells
+        'threq',                    # theoretical throughput according the cells needed in links closer to the root
+        'hopsToRoot',
+        'numRandomSelections',      # random selections performed (when no cells are available, or when OTF-sf0 is used)
+        'txQueueFill',
+    ]
+    CHARGES = [
+        'chargeIdle',               # idle listen
+        'chargeTxDataRxAck',
+        'chargeTxData',
+        'chargeRxDataTxAck',
+        'chargeRxData',
+    ]
+    OUTPUT_NAMES = {
+        'queueDelay':               'aveQueueDelay',
+        'latency':                  'aveLatency',
+        'hops':                     'aveHops',
+        'hopsToRoot':               'aveHopsPackets',
+        'numPacketSent':            'PKTTX',
+        'numPacketReceived':        'PKTRX',
+        'numTransmissions':         'numTx',
+        'numReceptions':            'numRx',
+        'threq':                    'thReqCells',
+    }
+
+    def __init__(self,numMotes,chargesPerActivity):
+
+        columns                        = self.COUNTERS+[s+suffix for s in self.SAMPLES for suffix in ['Sum','Num']]+self.GAUGES+self.CHARGES
+
+        # store params
+        self.charges                   = numpy.array([chargesPerActivity[c] for c in self.CHARGES],dtype=numpy.float64)
+
+        # local variables
+        self.column                    = dict([(name,i) for (i,name) in enumerate(columns)])
+        self.values                    = numpy.zeros((numMotes,len(columns)),dtype=numpy.int64)
+        self.counterColumns            = [self.column[c] for c in self.COUNTERS]
+        self.gaugeColumns              = [self.column[g] for g in self.GAUGES]
+        self.chargeColumns             = [self.column[c] for c in self.CHARGES]
+
+    #======================== public ==========================================
+
+    def increment(self,moteId,name):
+        self.values[moteId,self.column[name]] += 1
+
+    def logSample(self,moteId,name,value):
+        self.values[moteId,self.column[name+'Sum']] += value
+        self.values[moteId,self.column[name+'Num']] += 1
+
+    def get(self,moteId,name):
+        return int(self.values[moteId,self.column[name]])
+
+    def set(self,moteId,name,value):
+        self.values[moteId,self.column[name]] = value
+
+    def add(self,moteId,name,value):
+        self.values[moteId,self.column[name]] += value
+
+    def getCharge(self,moteId):
+        ''' the charge consumed by a mote since the start (uC) '''
+        return float(self.values[moteId,self.chargeColumns].dot(self.charges))
+
+    def getCharges(self,since=None):
+        ''' the charge consumed by each mote (uC), since the snapshot since '''
+        period = self.values if since is None else self.values-since
+        return period[:,self.chargeColumns].dot(self.charges)
+
+    def getSnapshot(self):
+        ''' a copy of the statistics, to compute the counters over a period '''
+        return self.values.copy()
+
+    def getMoteStats(self,moteId,since=None):
+        ''' the statistics of a mote, the counters and samples since the snapshot since '''
+        return self._toDict(self.values[moteId:moteId+1],None if since is None else since[moteId:moteId+1])
+
+    def getNetworkStats(self,since=None):
+        '''
+        the statistics of all motes summed, the counters and samples since the
+        snapshot since. Samples are averaged per mote, then summed.
+        '''
+        return self._toDict(self.values,since)
+
+    #======================== private =========================================
+
+    def _toDict(self,values,since):
+
+        period       = values if since is None else values-since
+        counters     = period[:,self.counterColumns].sum(axis=0)
+        gauges       = values[:,self.gaugeColumns].sum(axis=0)
+
+        returnVal    = dict(zip(self.COUNTERS,[int(v) for v in counters]))
+        returnVal.update(dict(zip(self.GAUGES,[int(v) for v in gauges])))
+
+        for name in self.SAMPLES:
+            sums     = period[:,self.column[name+'Sum']]
+            nums     = period[:,self.column[name+'Num']]
+            mask     = nums>0
+            # a mote without samples counts as int 0, like in the outputs so far
+            # summed in mote order, so the outputs do not depend on numpy
+            if mask.any():
+                returnVal[name] = sum((sums[mask].astype(numpy.float64)/nums[mask]).tolist())
+            else:
+                returnVal[name] = 0
+
+        # the charge since the start, and over the period
+        for (name,chargeValues) in [('chargeConsumed',values),('chargeConsumedCycle',period)]:
+            charges  = chargeValues[:,self.chargeColumns].dot(self.charges)
+            returnVal[name] = sum(charges.tolist()) if charges.any() else 0
+
+        return dict([(self.OUTPUT_NAMES.get(k,k),v) for (k,v) in returnVal.items()])
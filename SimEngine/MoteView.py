@@ -0,0 +1,96 @@
+#!/usr/bin/python
+'''
+\brief A mote whose state is stored in the arrays of the network (stateArrays).
+'''
+
+#============================ imports =========================================
+
+import numpy
+
+import Mote
+
+#============================ defines =========================================
+
+def _intState(name):
+    ''' attribute of the mote stored in an integer array of NetworkState '''
+    return property(
+        lambda self:       self.engine.networkState.getInt(name,self.id),
+        lambda self,value: self.engine.networkState.setInt(name,self.id,value),
+    )
+
+def _floatState(name):
+    ''' attribute of the mote stored in a float array of NetworkState '''
+    return property(
+        lambda self:       float(getattr(self.engine.networkState,name)[self.id]),
+        lambda self,value: getattr(self.engine.networkState,name).__setitem__(self.id,value),
+    )
+
+def _moteState(name):
+    ''' attribute of the mote holding a mote, stored as its id in NetworkState '''
+    def get(self):
+        id = self.engine.networkState.getInt(name,self.id)
+        return None if id is None else self.engine.motes[id]
+    def set(self,mote):
+        self.engine.networkState.setInt(name,self.id,None if mote is None else mote.id)
+    return property(get,set)
+
+#============================ body ============================================
+
+class MoteView(Mote.Mote):
+    '''
+    Same behavior as Mote, but the RPL, clock and radio state (and, as for
+    all motes, the statistics, see MoteStats) are stored in the arrays of
+    NetworkState, so a mote costs a few attributes instead of two dicts
+    over the whole network. The motes also share the lock of the engine.
+    '''
+
+    rank                               = _intState('rank')
+    dagRank                            = _intState('dagRank')
+    timeCorrectedSlot                  = _intState('timeCorrectedSlot')
+    preferredParent                    = _moteState('preferredParent')
+    drift                              = _floatState('drift')
+
+    def __init__(self,id):
+        Mote.Mote.__init__(self,id)
+        self.state                     = self.engine.networkState
+        self.dataLock                  = self.engine.dataLock
+        self.RSSI                      = None  # see NetworkState.rssi
+        self.PDR                       = None  # see NetworkState.pdr
+
+    #===== wireless
+
+    def setPDR(self,neighbor,pdr):
+        ''' sets the pdr to that neighbor'''
+        with self.dataLock:
+            self.state.pdr[self.id,neighbor.id] = pdr
+            self._resetETX(neighbor)
+
+    def getPDR(self,neighbor):
+        ''' returns the pdr to that neighbor'''
+        with self.dataLock:
+            return self.state.getLink('pdr',self.id,neighbor.id)
+
+    def setRSSI(self,neighbor,rssi):
+        ''' sets the RSSI to that neighbor'''
+        with self.dataLock:
+            self.state.rssi[self.id,neighbor.id] = rssi
+
+    def getRSSI(self,neighbor):
+        ''' returns the RSSI to that neighbor'''
+        with self.dataLock:
+            if neighbor==self:
+                return self.minRssi
+            return self.state.getLink('rssi',self.id,neighbor.id)
+
+    def _myNeigbors(self):
+        return self._motes(self.state.pdr[self.id]>0)
+
+    def _myInterferersNeigbors(self):
+        return self._motes((self.state.rssi[self.id]+(-97-(-105)))>=self.minRssi)
+
+    def _myGoodNeigbors(self):
+        return self._motes(self.state.pdr[self.id]>0.5)
+
+    def _motes(self,mask):
+        motes = self.engine.motes
+        return [motes[i] for i in numpy.flatnonzero(mask)]
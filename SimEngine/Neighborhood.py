@@ -0,0 +1,128 @@
+#!/usr/bin/python
+'''
+\brief The cells used in the neighborhood of a mote, as learnt from the
+schedules its neighbors broadcast (deBras).
+'''
+
+#============================ imports =========================================
+
+import BitCounter
+import Cell
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Neighborhood(object):
+    '''
+    For each neighbor, a snapshot of the TX and RX cells of its schedule
+    when its last broadcast was received, and the aggregated bitmaps over
+    all neighbors. The aggregates are only updated when a snapshot changes,
+    so the deBras reservations do not depend on the neighborhood size.
+
+    Neighbors broadcast their schedule as (baseVersion,version,delta,cells),
+    see Mote._schedule_getUpdate(). The snapshot is skipped if it is already
+    at version, patched with delta if it is at baseVersion, and rebuilt from
+    cells otherwise (a broadcast was missed).
+
+    'rxReach' are the RX cells of a neighbor whose transmitter can interfere
+    with the owner (RSSI at least minRssi-8dB).
+    '''
+
+    TX                                 = 0
+    RX                                 = 1
+    RX_REACH                           = 2
+
+    def __init__(self,mote):
+
+        # store params
+        self.mote                      = mote
+
+        # local variables
+        self.snapshots                 = {}  # indexed by neighbor, (tx,rx,rxReach) bitmaps
+        self.versions                  = {}  # indexed by neighbor, version of the snapshot
+        self.counters                  = (BitCounter.BitCounter(),BitCounter.BitCounter(),BitCounter.BitCounter())
+        self.txReach                   = {}  # indexed by target, cache of getTxReach()
+
+    #======================== public ==========================================
+
+    def addNeighbor(self,neighbor):
+        # an empty schedule is at version 0
+        self.snapshots[neighbor]       = (0,0,0)
+        self.versions[neighbor]        = 0
+
+    def updateNeighbor(self,neighbor,update):
+        ''' apply the schedule update received from neighbor '''
+
+        (baseVersion,version,delta,cells) = update
+
+        if version==self.versions[neighbor]:
+            return
+
+        old = self.snapshots[neighbor]
+        if baseVersion==self.versions[neighbor]:
+            new = list(old)
+            for (isAdded,ts,ch,dir,n) in delta:
+                self._setCell(new,ts,ch,dir,n,isAdded)
+        else:
+            new = [0,0,0]
+            for (ts,ch,dir,n) in cells:
+                self._setCell(new,ts,ch,dir,n,True)
+        new = tuple(new)
+
+        self.versions[neighbor]        = version
+        if new==old:
+            return
+
+        for i in range(len(new)):
+            if new[i]!=old[i]:
+                self.counters[i].update(old[i],new[i])
+        if new[self.TX]!=old[self.TX]:
+            self.txReach = {}
+
+        self.snapshots[neighbor]       = new
+
+    def getTx(self,exclude):
+        ''' TX cells of the neighbors other than exclude '''
+        return self._getOthers(self.TX,exclude)
+
+    def getRx(self,exclude):
+        ''' RX cells of the neighbors other than exclude '''
+        return self._getOthers(self.RX,exclude)
+
+    def getRxReach(self,exclude):
+        ''' RX cells of the neighbors other than exclude, whose transmitter can interfere with me '''
+        return self._getOthers(self.RX_REACH,exclude)
+
+    def getTxReach(self,target):
+        ''' TX cells of the neighbors (other than target) that target can interfere with '''
+        if target not in self.txReach:
+            bitmap = 0
+            for (neighbor,snapshot) in self.snapshots.items():
+                if neighbor!=target and target.getRSSI(neighbor)+(-97-(-105)) >= self.mote.minRssi:
+                    bitmap |= snapshot[self.TX]
+            self.txReach[target] = bitmap
+        return self.txReach[target]
+
+    #======================== private =========================================
+
+    def _setCell(self,snapshot,ts,ch,dir,neighbor,isAdded):
+        if dir==Cell.Cell.DIR_TX:
+            indexes = [self.TX]
+        elif dir==Cell.Cell.DIR_RX:
+            indexes = [self.RX]
+            if neighbor.getRSSI(self.mote)+(-97-(-105)) >= self.mote.minRssi:
+                indexes += [self.RX_REACH]
+        else:
+            return
+        bit = 1<<(ts*self.mote.settings.numChans+ch)
+        for i in indexes:
+            if isAdded:
+                snapshot[i] |= bit
+            else:
+                snapshot[i] &= ~bit
+
+    def _getOthers(self,i,exclude):
+        if exclude in self.snapshots:
+            return self.counters[i].getOthers(self.snapshots[exclude][i])
+        return self.counters[i].any
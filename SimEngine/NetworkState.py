@@ -0,0 +1,54 @@
+#!/usr/bin/python
+'''
+\brief The state of all the motes of the network, in arrays (stateArrays).
+'''
+
+#============================ imports =========================================
+
+import numpy
+
+#============================ defines =========================================
+
+NONE                                   = -1          # None in the integer arrays
+UNSET                                  = -numpy.inf  # no RSSI/PDR to that mote
+
+#============================ body ============================================
+
+class NetworkState(object):
+    '''
+    The per-mote state of the motes, and the RSSI and PDR between each pair
+    of motes, in arrays indexed by mote id, read and written by MoteView.
+
+    The RSSI and PDR are N*N matrices instead of one dict per mote, UNSET
+    when the mote is not a neighbor, so the neighbors of a mote are found
+    with one vectorized comparison.
+    '''
+
+    def __init__(self,numMotes):
+
+        # local variables
+        self.rank                      = numpy.full(numMotes,NONE,dtype=numpy.int64)
+        self.dagRank                   = numpy.full(numMotes,NONE,dtype=numpy.int64)
+        self.preferredParent           = numpy.full(numMotes,NONE,dtype=numpy.int32)
+        self.timeCorrectedSlot         = numpy.full(numMotes,NONE,dtype=numpy.int64)
+        self.drift                     = numpy.zeros(numMotes,dtype=numpy.float64)
+        self.rssi                      = numpy.full((numMotes,numMotes),UNSET,dtype=numpy.float64)
+        self.pdr                       = numpy.full((numMotes,numMotes),UNSET,dtype=numpy.float64)
+
+    #======================== public ==========================================
+
+    def getInt(self,name,moteId):
+        ''' the value of an integer state of a mote, None if not set '''
+        value = getattr(self,name)[moteId]
+        return None if value==NONE else int(value)
+
+    def setInt(self,name,moteId,value):
+        getattr(self,name)[moteId] = NONE if value is None else value
+
+    def getLink(self,name,moteId,neighborId):
+        ''' the RSSI or PDR from a mote to a neighbor, KeyError if not set like a dict '''
+        value = getattr(self,name)[moteId,neighborId]
+        if value==UNSET:
+            raise KeyError(neighborId)
+        return float(value)
+
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+'''
+\brief Network-wide cell occupancy.
+'''
+
+#============================ imports =========================================
+
+import BitCounter
+import Cell
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Occupancy(object):
+    '''
+    Which motes use each cell, for the centralized schedulers and the
+    statistics.
+
+    The motes report the cells they add and remove (addCell/removeCell), and
+    the cells used by at least one mote are kept as a bitmap with the same
+    layout as Schedule (cell (ts,ch) is bit ts*numChans+ch).
+
+    For each mote, the TX and RX cells of the motes it interferes with (see
+    ConflictGraph) are also counted, so the cells in conflict with a new
+    link are known without visiting the neighborhood.
+    '''
+
+    def __init__(self,numChans,conflictGraph):
+
+        # store params
+        self.numChans                  = numChans
+        self.conflictGraph             = conflictGraph
+
+        # local variables
+        self.cellOwners                = {}  # indexed by (ts,ch), set of (mote,dir)
+        self.usedBitmap                = 0   # cells used by at least one mote
+        self.txNear                    = {}  # indexed by mote, BitCounter of the TX cells of its interferers
+        self.rxNear                    = {}  # indexed by mote, BitCounter of the RX cells of its interferers
+        self.numCells                  = {}  # indexed by dir, number of cells of the motes
+
+    #======================== public ==========================================
+
+    def addCell(self,mote,ts,ch,dir):
+        bit = 1<<(ts*self.numChans+ch)
+        if (ts,ch) not in self.cellOwners:
+            self.cellOwners[(ts,ch)]   = set()
+            self.usedBitmap           |= bit
+        self.cellOwners[(ts,ch)].add((mote,dir))
+        self.numCells[dir]             = self.numCells.get(dir,0)+1
+        self._updateNear(mote,dir,0,bit)
+
+    def removeCell(self,mote,ts,ch,dir):
+        bit = 1<<(ts*self.numChans+ch)
+        owners = self.cellOwners[(ts,ch)]
+        owners.remove((mote,dir))
+        if not owners:
+            del self.cellOwners[(ts,ch)]
+            self.usedBitmap           &= ~bit
+        self.numCells[dir]            -= 1
+        self._updateNear(mote,dir,bit,0)
+
+    def getCellOwners(self,ts,ch):
+        ''' returns the set of (mote,dir) using cell (ts,ch) '''
+        return self.cellOwners.get((ts,ch),set())
+
+    def getNumCells(self,dir):
+        ''' returns the number of cells in direction dir, summed over the motes '''
+        return self.numCells.get(dir,0)
+
+    def getConflictingCells(self,mote,neighbor):
+        '''
+        returns the cells in which a mote interfering with mote transmits, or
+        a mote interfering with neighbor receives
+        '''
+        return self._getNear(self.txNear,mote) | self._getNear(self.rxNear,neighbor)
+
+    #======================== private =========================================
+
+    def _updateNear(self,mote,dir,old,new):
+        if dir==Cell.Cell.DIR_TX:
+            near = self.txNear
+        elif dir==Cell.Cell.DIR_RX:
+            near = self.rxNear
+        else:
+            return
+        for m in self.conflictGraph.getInterferedBy(mote):
+            if m not in near:
+                near[m] = BitCounter.BitCounter()
+            near[m].update(old,new)
+
+    def _getNear(self,near,mote):
+        if mote in near:
+            return near[mote].any
+        return 0
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+'''
+\brief The OTF housekeeping of all the motes at once (otfSynchronized).
+'''
+
+#============================ imports =========================================
+
+import numpy
+
+import SimEngine
+import SimSettings
+import Mote
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class OtfHousekeeping(object):
+    '''
+    Every otfHousekeepingPeriod, updates the moving averages of the incoming
+    traffic of all motes and computes the cells they need in one vectorized
+    step, then calls 6top (Mote._otf_adaptCells) only for the motes which
+    have to add or remove cells.
+
+    The incoming traffic is counted per (mote,neighborOrMe) pair, in arrays
+    indexed by the order the pairs first appeared. Same algorithm as
+    Mote._otf_action_housekeeping.
+    '''
+
+    def __init__(self,motes):
+
+        # store params
+        self.motes                     = motes
+
+        # local variables
+        self.engine                    = SimEngine.SimEngine()
+        self.settings                  = SimSettings.SimSettings()
+        self.active                    = numpy.zeros(len(motes),dtype=bool)    # motes running OTF
+        self.pairIndex                 = {}                                    # indexed by (moteId,neighborOrMeId)
+        self.numPairs                  = 0
+        self.receiver                  = numpy.zeros(0,dtype=numpy.int32)
+        self.source                    = numpy.zeros(0,dtype=numpy.int32)
+        self.inTraffic                 = numpy.zeros(0,dtype=numpy.int64)
+        self.movingAve                 = numpy.zeros(0,dtype=numpy.float64)
+        self.hasMovingAve              = numpy.zeros(0,dtype=bool)
+
+        self._schedule_housekeeping()
+
+    #======================== public ==========================================
+
+    def addMote(self,mote):
+        ''' mote starts OTF, at the next housekeeping '''
+        self.active[mote.id] = True
+
+    def incrementTraffic(self,mote,neighborOrMe):
+        i = self.pairIndex.get((mote.id,neighborOrMe.id))
+        if i is None:
+            i = self._addPair(mote.id,neighborOrMe.id)
+        self.inTraffic[i] += 1
+
+    #======================== private =========================================
+
+    def _schedule_housekeeping(self):
+        self.engine.scheduleIn(
+            delay       = self.settings.otfHousekeepingPeriod,
+            cb          = self._action_housekeeping,
+            uniqueTag   = (None,'_otf_action_housekeeping'),
+            priority    = 4,
+        )
+
+    def _action_housekeeping(self):
+
+        n            = self.numPairs
+        receiver     = self.receiver[:n]
+        source       = self.source[:n]
+        inTraffic    = self.inTraffic[:n]
+        movingAve    = self.movingAve[:n]
+        hasMovingAve = self.hasMovingAve[:n]
+        rows         = self.active[receiver]
+
+        # the pairs to a neighbor I have RX cells from, among the ones with traffic
+        fromMe       = receiver==source
+        rxNeighbor   = numpy.zeros(n,dtype=bool)
+        for i in numpy.flatnonzero(rows & ~fromMe & (hasMovingAve | (inTraffic!=0))):
+            mote     = self.motes[receiver[i]]
+            if mote.schedule.getCellsToNeighbor(self.motes[source[i]],Mote.Mote.DIR_RX):
+                rxNeighbor[i] = True
+
+        # update the moving averages, reset the counters
+        smoothed     = rows & hasMovingAve & rxNeighbor
+        started      = rows & ~smoothed & (rxNeighbor | fromMe) & (inTraffic!=0)
+        a            = Mote.Mote.OTF_TRAFFIC_SMOOTHING
+        movingAve[smoothed]  = inTraffic[smoothed]*a+movingAve[smoothed]*(1-a)
+        movingAve[started]   = inTraffic[started]
+        hasMovingAve[rows]   = (smoothed | started)[rows]
+        inTraffic[rows]      = 0
+
+        # generated traffic of each mote, in pkts/cycle
+        genTraffic   = numpy.bincount(
+            receiver,
+            weights   = numpy.where(hasMovingAve,movingAve,0.0)/self.settings.otfHousekeepingPeriod,
+            minlength = len(self.motes),
+        )
+        genTraffic   = genTraffic*(self.settings.slotframeLength*self.settings.slotDuration)
+
+        # cells needed by each mote with one parent, the others split their traffic in _otf_adaptCells
+        motes        = [m for m in self.motes if self.active[m.id] and len(m.trafficPortionPerParent)==1]
+        ids          = numpy.array([m.id for m in motes],dtype=numpy.int32)
+        parents      = [m.trafficPortionPerParent.items()[0] for m in motes]
+        portion      = numpy.array([p for (_,p) in parents],dtype=numpy.float64)
+        etx          = numpy.array([m._estimateETX(parent) for (m,(parent,_)) in zip(motes,parents)],dtype=numpy.float64)
+        etx          = numpy.minimum(etx,Mote.Mote.RPL_MAX_ETX)
+        nowCells     = numpy.array([m.numCellsToNeighbors.get(parent,0) for (m,(parent,_)) in zip(motes,parents)],dtype=numpy.int64)
+        threshold    = numpy.ceil(portion*self.settings.otfThreshold).astype(numpy.int64)
+        if self.settings.otfEnabled==True:
+            reqCells = numpy.ceil(portion*genTraffic[ids]*etx).astype(numpy.int64)
+        else:
+            reqCells = numpy.array([m.getMyMaxCellDemand() for m in motes],dtype=numpy.int64)
+
+        # 6top only for the motes whose cells do not match their demand, in the order of the motes
+        change       = (nowCells==0) | (nowCells<reqCells) | (reqCells<nowCells-threshold)
+        index        = dict([(m.id,i) for (i,m) in enumerate(motes)])
+        for mote in self.motes:
+            if not self.active[mote.id] or not mote.trafficPortionPerParent:
+                continue
+            i = index.get(mote.id)
+            if i is None or change[i]:
+                mote._otf_adaptCells(float(genTraffic[mote.id]))
+            else:
+                mote.numReqCells = int(reqCells[i])
+                if self.settings.otfEnabled!=True:
+                    mote.myMaxCellDemand = mote.numReqCells
+
+        self._schedule_housekeeping()
+
+    def _addPair(self,moteId,neighborOrMeId):
+        i = self.numPairs
+        if i==len(self.receiver):
+            size               = max(2*i,len(self.motes))
+            self.receiver      = numpy.resize(self.receiver,size)
+            self.source        = numpy.resize(self.source,size)
+            self.inTraffic     = numpy.resize(self.inTraffic,size)
+            self.movingAve     = numpy.resize(self.movingAve,size)
+            self.hasMovingAve  = numpy.resize(self.hasMovingAve,size)
+        self.receiver[i]       = moteId
+        self.source[i]         = neighborOrMeId
+        self.inTraffic[i]      = 0
+        self.movingAve[i]      = 0
+        self.hasMovingAve[i]   = False
+        self.pairIndex[(moteId,neighborOrMeId)] = i
+        self.numPairs         += 1
+        return i
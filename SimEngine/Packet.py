@@ -0,0 +1,60 @@
+#!/usr/bin/python
+'''
+\brief A packet in the TSCH queue of a mote, or in the air.
+'''
+
+#============================ imports =========================================
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Packet(object):
+    '''
+    Slotted, so that the packets queued in the network stay small. A relay
+    creates a new packet from the fields of the received one (see relay())
+    instead of copying it: the sender keeps its own packet until it is
+    ACKed.
+
+    'asn' is when the packet entered the queue of the mote, 'createdAsn' when
+    it was generated by 'origin'. 'scheduleUpdate' is only set in schedule
+    broadcasts (deBras).
+
+    The type is a small int, TYPE_NAMES gives its name for the outputs.
+    '''
+
+    TYPE_DATA                          = 0
+    TYPE_MYTRAFFIC                     = 1
+    TYPE_MYSCHEDULE                    = 2
+    TYPE_NAMES                         = {TYPE_DATA: 'DATA', TYPE_MYTRAFFIC: 'TRAFFICOMIO', TYPE_MYSCHEDULE: 'SIXP_TYPE_MYSCHEDULE'}
+
+    __slots__ = (
+        'asn',
+        'type',
+        'origin',
+        'createdAsn',
+        'numHops',
+        'retriesLeft',
+        'scheduleUpdate',
+    )
+
+    def __init__(self,asn,type,origin,retriesLeft,createdAsn=None,numHops=1,scheduleUpdate=None):
+
+        self.asn                       = asn
+        self.type                      = type
+        self.origin                    = origin
+        self.createdAsn                = asn if createdAsn==None else createdAsn
+        self.numHops                   = numHops
+        self.retriesLeft               = retriesLeft
+        self.scheduleUpdate            = scheduleUpdate
+
+    def relay(self,asn,retriesLeft):
+        ''' the packet a relay enqueues, one hop further '''
+        return Packet(
+            asn                        = asn,
+            type                       = self.type,
+            origin                     = self.origin,
+            retriesLeft                = retriesLeft,
+            createdAsn                 = self.createdAsn,
+            numHops                    = self.numHops+1,
+        )
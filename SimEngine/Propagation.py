@@ -29,6 +29,7 @@ import operator
 import Topology
 import SimSettings
 import SimEngine
+import Packet
 
 #============================ defines =========================================
 
@@ -124,7 +125,7 @@ class Propagation(object):
                 isACKed     = False
                 isNACKed    = False
 
-                if 'SIXP_TYPE_MYSCHEDULE' == transmission['type']:
+                if transmission['type']==Packet.Packet.TYPE_MYSCHEDULE:
                     
                     while i<len(self.receivers):
                         if self.receivers[i]['channel']==transmission['channel']:
@@ -147,7 +148,7 @@ class Propagation(object):
                             
                             if lockOn == transmission['smac']:
                                 # mote locked in the current signal
-                                transmission['smac'].schedule[(ts,transmission['channel'])]['debug_lockInterference'] += [0] # debug only
+                                transmission['smac'].schedule[(ts,transmission['channel'])].logLockInterference(0) # debug only
                                 
                                 # calculate pdr, including interference
                                 sinr  = self._computeSINR(transmission['smac'],self.receivers[i]['mote'],interferers,True)
@@ -202,7 +203,7 @@ class Propagation(object):
                                             interferenceFlag = 1
                                             
                                     
-                                    transmission['smac'].schedule[(ts,transmission['channel'])]['debug_interference'] += [interferenceFlag] # debug only
+                                    transmission['smac'].schedule[(ts,transmission['channel'])].logInterference(interferenceFlag) # debug only
                                                                                                           
                                     if interferenceFlag:
                                         transmission['smac'].stats_incrementRadioStats('probableCollisions') 
@@ -216,7 +217,7 @@ class Propagation(object):
                                     if lockOn == transmission['smac']:
                                         # mote locked in the current signal
                                         
-                                        transmission['smac'].schedule[(ts,transmission['channel'])]['debug_lockInterference'] += [0] # debug only
+                                        transmission['smac'].schedule[(ts,transmission['channel'])].logLockInterference(0) # debug only
                                         
                                         # calculate pdr, including interference
                                         sinr  = self._computeSINR(transmission['smac'],transmission['dmac'],interferers,False)
@@ -253,7 +254,7 @@ class Propagation(object):
                                         # mote locked in an interfering signal
 
                                         # for debug
-                                        transmission['smac'].schedule[(ts,transmission['channel'])]['debug_lockInterference'] += [1]
+                                        transmission['smac'].schedule[(ts,transmission['channel'])].logLockInterference(1)
                                         
                                         # receive the interference as if it's a desired packet
                                         interferers.remove(lockOn)
@@ -268,7 +269,7 @@ class Propagation(object):
                                         if pseudo_pdr>=failure:
                                             # success to receive the interference and realize collision
                                             
-                                            transmission['dmac'].schedule[(ts,transmission['channel'])]['rxDetectedCollision'] = True
+                                            transmission['dmac'].schedule[(ts,transmission['channel'])].rxDetectedCollision = True
                                             
                                         # desired packet is not received
                                         self.engine.incrementStatDropByCollision()
@@ -317,12 +318,10 @@ class Propagation(object):
                         failure = random.random()
 
                         if pseudo_pdr>=failure:
-                            for cell in lockOn.schedule.keys():
-                                if cell in r['mote'].schedule.keys():
-                                    if cell[0] == ts:
-                                        # success to receive the interference and realize collision
-                                         
-                                        r['mote'].schedule[(ts,cell[1])]['rxDetectedCollision'] = True
+                            for cell in lockOn.schedule.getCellsAtTs(ts):
+                                if (ts,cell.ch) in r['mote'].schedule:
+                                    # success to receive the interference and realize collision
+                                    r['mote'].schedule[(ts,cell.ch)].rxDetectedCollision = True
 
                     # desired packet is not received                   
                     r['mote'].radio_rxDone(None,None,None,None,r['channel'])
@@ -0,0 +1,215 @@
+#!/usr/bin/python
+'''
+\brief The TSCH schedule of a mote.
+'''
+
+#============================ imports =========================================
+
+import bisect
+
+import Cell
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class Schedule(dict):
+    '''
+    Cells of a mote, indexed by (ts,ch) like a plain dictionary.
+
+    Adding (schedule[(ts,ch)] = cell) and removing (del schedule[(ts,ch)])
+    cells also maintains secondary indexes:
+    - by timeslot, so the slot-by-slot operations only touch the cells of
+      the current timeslot.
+    - by (neighbor,dir) bundle, in the order the cells were added, with the
+      running numTx/numTxAck sums of the bundle. Use logTx() and logTxAck()
+      to update these counters.
+    - as occupancy bitmaps (all, TX, RX cells and per bundle), integers where
+      cell (ts,ch) is bit ts*numChans+ch.
+
+    Every change increments the version of the schedule. With logChanges,
+    the changes are also appended to a change log, so the schedule can be
+    sent as the changes since a given version (see getChangesSince() and
+    trimChangeLog()).
+    '''
+
+    def __init__(self,slotframeLength,numChans,logChanges=False):
+
+        # initialize the parent class
+        dict.__init__(self)
+
+        # store params
+        self.slotframeLength           = slotframeLength
+        self.numChans                  = numChans
+        self.logChanges                = logChanges
+
+        # local variables
+        self.allCellsBitmap            = (1<<(slotframeLength*numChans))-1
+        self.usedBitmap                = 0
+        self.txBitmap                  = 0
+        self.rxBitmap                  = 0
+        self.bitmapPerBundle           = {}  # indexed by (neighbor,dir)
+        self.version                   = 0
+        self.changeLog                 = []  # (version,isAdded,ts,ch,dir,neighbor), sorted by version
+        self.snapshot                  = ()  # cache of getSnapshot()
+        self.cellsPerTs                = {}  # indexed by ts, cells of that ts sorted by channel
+        self.timeslots                 = []  # sorted list of the active timeslots
+        self.cellsPerBundle            = {}  # indexed by (neighbor,dir), cells in the order they were added
+        self.numTxPerBundle            = {}  # indexed by (neighbor,dir), sum of numTx of the cells
+        self.numTxAckPerBundle         = {}  # indexed by (neighbor,dir), sum of numTxAck of the cells
+        self.numCellsPerDir            = {}  # indexed by dir
+
+    #======================== public ==========================================
+
+    def __setitem__(self,key,cell):
+        if key in self:
+            del self[key]
+
+        dict.__setitem__(self,key,cell)
+
+        (ts,ch) = key
+        if ts not in self.cellsPerTs:
+            self.cellsPerTs[ts] = []
+            bisect.insort(self.timeslots,ts)
+        cells = self.cellsPerTs[ts]
+        i = 0
+        while i<len(cells) and cells[i].ch<ch:
+            i += 1
+        cells.insert(i,cell)
+
+        bit = self.getCellBit(ts,ch)
+        self.usedBitmap                   |= bit
+        if cell.dir==Cell.Cell.DIR_TX:
+            self.txBitmap                 |= bit
+        elif cell.dir==Cell.Cell.DIR_RX:
+            self.rxBitmap                 |= bit
+
+        bundle = (cell.neighbor,cell.dir)
+        if bundle not in self.cellsPerBundle:
+            self.cellsPerBundle[bundle]    = []
+            self.numTxPerBundle[bundle]    = 0
+            self.numTxAckPerBundle[bundle] = 0
+            self.bitmapPerBundle[bundle]   = 0
+        self.cellsPerBundle[bundle]       += [cell]
+        self.bitmapPerBundle[bundle]      |= bit
+        self.numTxPerBundle[bundle]       += cell.numTx
+        self.numTxAckPerBundle[bundle]    += cell.numTxAck
+        self.numCellsPerDir[cell.dir]      = self.numCellsPerDir.get(cell.dir,0)+1
+
+        self._logChange(True,cell)
+
+    def __delitem__(self,key):
+        cell = self[key]
+
+        dict.__delitem__(self,key)
+
+        (ts,ch) = key
+        cells = self.cellsPerTs[ts]
+        cells.remove(cell)
+        if not cells:
+            del self.cellsPerTs[ts]
+            del self.timeslots[bisect.bisect_left(self.timeslots,ts)]
+
+        mask = ~self.getCellBit(ts,ch)
+        self.usedBitmap                   &= mask
+        self.txBitmap                     &= mask
+        self.rxBitmap                     &= mask
+
+        bundle = (cell.neighbor,cell.dir)
+        self.cellsPerBundle[bundle].remove(cell)
+        if self.cellsPerBundle[bundle]:
+            self.numTxPerBundle[bundle]    -= cell.numTx
+            self.numTxAckPerBundle[bundle] -= cell.numTxAck
+            self.bitmapPerBundle[bundle]   &= mask
+        else:
+            del self.cellsPerBundle[bundle]
+            del self.numTxPerBundle[bundle]
+            del self.numTxAckPerBundle[bundle]
+            del self.bitmapPerBundle[bundle]
+        self.numCellsPerDir[cell.dir]      -= 1
+
+        self._logChange(False,cell)
+
+    def getCellsAtTs(self,ts):
+        ''' returns the cells of a timeslot, sorted by channel '''
+        return self.cellsPerTs.get(ts,[])
+
+    def getCellsToNeighbor(self,neighbor,dir):
+        ''' returns the cells of the (neighbor,dir) bundle '''
+        return self.cellsPerBundle.get((neighbor,dir),[])
+
+    def getNeighbors(self,dir):
+        ''' returns the neighbors I have cells to in direction dir '''
+        return [n for (n,d) in self.cellsPerBundle if d==dir]
+
+    def getNumCells(self,dir):
+        return self.numCellsPerDir.get(dir,0)
+
+    def getNumTx(self,neighbor,dir):
+        return self.numTxPerBundle.get((neighbor,dir),0)
+
+    def getNumTxAck(self,neighbor,dir):
+        return self.numTxAckPerBundle.get((neighbor,dir),0)
+
+    def logTx(self,cell):
+        cell.numTx                                        += 1
+        self.numTxPerBundle[(cell.neighbor,cell.dir)]     += 1
+
+    def logTxAck(self,cell):
+        cell.numTxAck                                     += 1
+        self.numTxAckPerBundle[(cell.neighbor,cell.dir)]  += 1
+
+    #===== bitmaps
+
+    def getCellBit(self,ts,ch):
+        return 1<<(ts*self.numChans+ch)
+
+    def getFreeBitmap(self):
+        ''' returns the bitmap of the cells not in this schedule '''
+        return self.allCellsBitmap & ~self.usedBitmap
+
+    def bitmapToCells(self,bitmap):
+        ''' returns the [ts,ch] cells of a bitmap, sorted by ts then ch '''
+        bits = bin(bitmap)[:1:-1]
+        return [[i//self.numChans,i%self.numChans] for (i,b) in enumerate(bits) if b=='1']
+
+    #===== versions
+
+    def getChangesSince(self,version):
+        ''' returns the (isAdded,ts,ch,dir,neighbor) changes made after version '''
+        assert self.logChanges
+        i = bisect.bisect_left(self.changeLog,(version+1,))
+        return [change[1:] for change in self.changeLog[i:]]
+
+    def trimChangeLog(self,version):
+        ''' forget the changes up to version '''
+        del self.changeLog[:bisect.bisect_left(self.changeLog,(version+1,))]
+
+    def getSnapshot(self):
+        ''' returns the (ts,ch,dir,neighbor) of all the cells, at the current version '''
+        if self.snapshot is None:
+            self.snapshot = tuple([(c.ts,c.ch,c.dir,c.neighbor) for c in self.values()])
+        return self.snapshot
+
+    #===== timeslots
+
+    def getNextActiveTs(self,ts):
+        '''
+        returns the first active timeslot after ts (wrapping around the
+        slotframe, and returning ts itself if it is the only active one),
+        or None if the schedule is empty
+        '''
+        if not self.timeslots:
+            return None
+        i = bisect.bisect_right(self.timeslots,ts)
+        if i<len(self.timeslots):
+            return self.timeslots[i]
+        return self.timeslots[0]
+
+    #======================== private =========================================
+
+    def _logChange(self,isAdded,cell):
+        self.version                  += 1
+        if self.logChanges:
+            self.changeLog            += [(self.version,isAdded,cell.ts,cell.ch,cell.dir,cell.neighbor)]
+        self.snapshot                  = None
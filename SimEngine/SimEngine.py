@@ -24,7 +24,15 @@ import threading
 
 import Propagation
 import Topology
+import ConflictGraph
+import Occupancy
+import Dodag
+import MoteStats
+import OtfHousekeeping
+import TrafficModel
+import NetworkState
 import Mote
+import MoteView
 import SimSettings
 import inspect
 
@@ -67,16 +75,47 @@ class SimEngine(threading.Thread):
         self.startCb                        = []
         self.endCb                          = []
         self.events                         = []
+        self.eventBatch                     = None # events queued at once by scheduleMany(), while booting
         self.settings                       = SimSettings.SimSettings()
         self.propagation                    = Propagation.Propagation()
-        self.motes                          = [Mote.Mote(id) for id in range(self.settings.numMotes)]
+        self.moteStats                      = MoteStats.MoteStats(self.settings.numMotes,Mote.Mote.CHARGES_uC)
+        if self.settings.stateArrays:
+            self.networkState               = NetworkState.NetworkState(self.settings.numMotes)
+            self.motes                      = [MoteView.MoteView(id) for id in range(self.settings.numMotes)]
+        else:
+            self.networkState               = None
+            self.motes                      = [Mote.Mote(id) for id in range(self.settings.numMotes)]
         self.topology                       = Topology.Topology(self.motes)
         self.topology.createTopology()
+        self.conflictGraph                  = ConflictGraph.ConflictGraph(self.motes)
+        self.occupancy                      = Occupancy.Occupancy(self.settings.numChans,self.conflictGraph)
+        self.dodag                          = Dodag.Dodag(self.motes)
+        if self.settings.otfSynchronized:
+            self.otfHousekeeping            = OtfHousekeeping.OtfHousekeeping(self.motes)
+        else:
+            self.otfHousekeeping            = None
+        
+        # compute the routes instead of letting RPL converge
+        if self.settings.rplOracle:
+            root                            = [m for m in self.motes if m.dagRoot][0]
+            (parents,ranks)                 = self.dodag.getShortestPaths(root)
+            for (mote,parent) in parents.items():
+                mote.rpl_setOracleRoute(parent,ranks[parent],ranks[mote])
 
-        # boot all motes
+        # boot all motes, their first events are queued at once
+        self.eventBatch                     = []
         for i in range(len(self.motes)):
             self.motes[i].boot()
         
+        # generate the packets of all motes at once
+        if self.settings.trafficModel!='periodic':
+            self.trafficModel               = TrafficModel.TrafficModel(self.motes)
+        else:
+            self.trafficModel               = None
+        
+        (events,self.eventBatch)            = (self.eventBatch,None)
+        self.scheduleMany(events)
+        
         self.initTimeStampTraffic          = 0
         self.endTimeStampTraffic           = 0       
         
@@ -117,7 +156,8 @@ class SimEngine(threading.Thread):
         
         print "TX total "+str(self.totalTx)
         print "RX total "+str(self.totalRx)
-        print "PER "+str(float(self.totalRx)/self.totalTx)
+        if self.totalTx!=0: #avoiding zero division
+            print "PER "+str(float(self.totalRx)/self.totalTx)
 
         self.propagation.destroy()
         
@@ -209,12 +249,17 @@ class SimEngine(threading.Thread):
         # make sure we are scheduling in the future
         assert asn>self.asn
         
-        # remove all events with same uniqueTag (the event will be rescheduled)
-        if uniqueTag:
-            self.removeEvent(uniqueTag,exceptCurrentASN)
-        
         with self.dataLock:
             
+            # queued with the other events of the batch, which replaces the same uniqueTags
+            if self.eventBatch is not None:
+                self.eventBatch += [(asn,priority,cb,uniqueTag)]
+                return
+            
+            # remove all events with same uniqueTag (the event will be rescheduled)
+            if uniqueTag:
+                self.removeEvent(uniqueTag,exceptCurrentASN)
+            
             # find correct index in schedule
             i = 0
             while i<len(self.events) and (self.events[i][0]<asn or (self.events[i][0]==asn and self.events[i][1]<=priority)):
@@ -223,8 +268,35 @@ class SimEngine(threading.Thread):
             # add to schedule
             self.events.insert(i,(asn,priority,cb,uniqueTag))           
     
+    def scheduleMany(self,events):
+        '''
+        puts a batch of (asn,priority,cb,uniqueTag) events to the queue at once,
+        in the order scheduleAtAsn() would have put them one by one. An event
+        without cb only removes the events with its uniqueTag (removeEvent()).
+        '''
+        
+        with self.dataLock:
+            
+            # the last event of each uniqueTag replaces the others
+            last = {}
+            for (i,(asn,_,cb,uniqueTag)) in enumerate(events):
+                assert cb is None or asn>self.asn
+                if uniqueTag:
+                    last[uniqueTag] = i
+            batch = [e for (i,e) in enumerate(events) if e[2] is not None and (not e[3] or last[e[3]]==i)]
+            
+            # remove the queued events with the same uniqueTags
+            if last:
+                self.events = [e for e in self.events if e[3] not in last or e[0]==self.asn]
+            
+            # merge, sorted() is stable: the queued events stay before the new ones with the same ASN and priority
+            self.events = sorted(self.events+batch,key=lambda e: (e[0],e[1]))
+    
     def removeEvent(self,uniqueTag,exceptCurrentASN=True):
         with self.dataLock:
+            if self.eventBatch is not None:
+                self.eventBatch += [(None,None,None,uniqueTag)]
+                return
             i = 0
             while i<len(self.events):
                 if self.events[i][3]==uniqueTag and not (exceptCurrentASN and self.events[i][0]==self.asn):
@@ -254,6 +326,12 @@ class SimEngine(threading.Thread):
     
     def getAsn(self):
         return self.asn
+    
+    def inMeasurementWindow(self):
+        ''' True after the warmupCycles, during the measurementCycles '''
+        start = self.settings.warmupCycles*self.settings.slotframeLength
+        end   = (self.settings.warmupCycles+self.settings.measurementCycles)*self.settings.slotframeLength
+        return start < self.asn < end
         
     #======================== private =========================================
     
@@ -22,6 +22,7 @@ log.addHandler(NullHandler())
 
 import SimEngine
 import SimSettings
+import Cell
 
 #============================ defines =========================================
 
@@ -57,6 +58,8 @@ class SimStats(object):
         # stats
         self.stats                          = {}
         self.columnNames                    = []
+        self.moteStatsSnapshot              = None  # statistics at the end of the previous cycle
+        self.chargePerCycle                 = []    # per cycle, the charge consumed by each mote (uC)
         
         # start file
         if self.runNum==0:
@@ -96,12 +99,12 @@ class SimStats(object):
         cycle = int(self.engine.getAsn()/self.settings.slotframeLength)
         
 	#emunicio        
-	# start probing at cycle 63 
-        if (self.engine.asn > (63*self.settings.slotframeLength)) and self.engine.initTimeStampTraffic==0:	
+	# start probing after the warm-up
+        if (self.engine.asn > (self.settings.warmupCycles*self.settings.slotframeLength)) and self.engine.initTimeStampTraffic==0:	
             self.engine.initTimeStampTraffic=self.engine.asn*self.settings.slotDuration
 
-        # stop probing at cycle 96   
-        if (self.engine.asn >= (96*self.settings.slotframeLength)) and self.engine.endTimeStampTraffic==0:
+        # stop probing at the end of the measurement window
+        if (self.engine.asn >= ((self.settings.warmupCycles+self.settings.measurementCycles)*self.settings.slotframeLength)) and self.engine.endTimeStampTraffic==0:
             self.engine.endTimeStampTraffic=self.engine.asn*self.settings.slotDuration
             self.engine.timeElapsedFlow=self.engine.endTimeStampTraffic-self.engine.initTimeStampTraffic        
             print "Elapsed time: "+str(self.engine.timeElapsedFlow)        
@@ -144,20 +147,32 @@ class SimStats(object):
     #=== collecting statistics
     
     def _collectSumMoteStats(self):
-        returnVal = {}
+        ''' the statistics of all motes summed, the counters over the last cycle '''
         
-        for mote in self.engine.motes:
-            moteStats        = mote.getMoteStats()
-            if not returnVal:
-                returnVal    = moteStats
-            else:
-                for k in returnVal.keys():
-                    returnVal[k] += moteStats[k]
+        moteStats                    = self.engine.moteStats
+        returnVal                    = moteStats.getNetworkStats(since=self.moteStatsSnapshot)
+        self.chargePerCycle         += [moteStats.getCharges(since=self.moteStatsSnapshot).tolist()]
+        self.moteStatsSnapshot       = moteStats.getSnapshot()
+        
+        returnVal['numTxCells']      = self.engine.occupancy.getNumCells(Cell.Cell.DIR_TX)
+        returnVal['numRxCells']      = self.engine.occupancy.getNumCells(Cell.Cell.DIR_RX)
+        # each mote reports the broadcast counters of the network, summed as such
+        returnVal['txBroadcast']     = self.engine.bcstTransmitted*len(self.engine.motes)
+        returnVal['rxBroadcast']     = self.engine.bcstReceived*len(self.engine.motes)
         
         return returnVal
 
     
         
+    def _getBatteryLifetime(self,mote):
+        ''' days until the battery of mote is empty, at its average current so far '''
+        duration  = self.engine.getAsn()*self.settings.slotDuration   # s
+        charge    = mote.chargeConsumed                               # uC
+        if not charge:
+            return float('inf')
+        capacity  = self.settings.batteryCapacity*3.6e6               # mAh to uC
+        return capacity/(charge/duration)/(24*3600)
+    
     def _collectScheduleStats(self):
         
         # compute the number of schedule collisions
@@ -165,29 +180,14 @@ class SimStats(object):
         # Note that this cannot count past schedule collisions which have been relocated by 6top
         # as this is called at the end of cycle   
         scheduleCollisions = 0
-        txCells = []
-        for mote in self.engine.motes:
-            for ((ts,chan),cell) in mote.schedule.items():
-                (ts,ch) = (ts,cell['ch'])
-                if cell['dir']==mote.DIR_TX:
-                    if (ts,ch) in txCells:
-                        scheduleCollisions += 1
-                    else:
-                        txCells += [(ts,ch)]
         
         # collect collided links
-        txLinks = {}
-        for mote in self.engine.motes:
-            for ((ts,chan),cell) in mote.schedule.items():
-                if cell['dir']==mote.DIR_TX:
-                    (ts,ch) = (ts,cell['ch'])
-                    (tx,rx) = (mote,cell['neighbor'])
-                    if (ts,ch) in txLinks:
-                        txLinks[(ts,ch)] += [(tx,rx)] 
-                    else:
-                        txLinks[(ts,ch)]  = [(tx,rx)]
-                        
-        collidedLinks = [txLinks[(ts,ch)] for (ts,ch) in txLinks if len(txLinks[(ts,ch)])>=2]
+        collidedLinks = []
+        for ((ts,ch),owners) in self.engine.occupancy.cellOwners.items():
+            txLinks = [(mote,mote.schedule[(ts,ch)].neighbor) for (mote,dir) in owners if dir==mote.DIR_TX]
+            if len(txLinks)>=2:
+                scheduleCollisions += len(txLinks)-1
+                collidedLinks      += [txLinks]
         
         # compute the number of Tx in schedule collision cells
         collidedTxs = 0
@@ -196,13 +196,12 @@ class SimStats(object):
               
         # compute the number of effective collided Tx    
         effectiveCollidedTxs = 0
-        insufficientLength   = 0 
         for links in collidedLinks:
             for (tx1,rx1) in links:
                 for (tx2,rx2) in links:
                     if tx1!=tx2 and rx1!=rx2:
                         # check whether interference from tx1 to rx2 is effective
-                        if tx1.getRSSI(rx2) >= rx2.minRssi:
+                        if self.engine.conflictGraph.interferes(tx1,rx2):
                             effectiveCollidedTxs += 1
         return {'scheduleCollisions':scheduleCollisions, 'collidedTxs': collidedTxs, 'effectiveCollidedTxs': effectiveCollidedTxs}
     
@@ -280,6 +279,19 @@ class SimStats(object):
                 ' '.join(['{0}@{1:.2f}'.format(mote.id,mote.getMoteStats()['chargeConsumed']/self.settings.numCyclesPerRun) for mote in self.engine.motes])
             )
         ] 
+        output += [
+            '#chargePerCycle runNum={0} {1}'.format(
+                self.runNum,
+                ' '.join(['{0}@{1}'.format(mote.id,'/'.join(['{0:.2f}'.format(charges[mote.id]) for charges in self.chargePerCycle])) for mote in self.engine.motes])
+            )
+        ]
+        output += [
+            '#batteryLifetimeDays runNum={0} batteryCapacity={1}mAh {2}'.format(
+                self.runNum,
+                self.settings.batteryCapacity,
+                ' '.join(['{0}@{1:.1f}'.format(mote.id,self._getBatteryLifetime(mote)) for mote in self.engine.motes])
+            )
+        ]
 	
 	output += [ ''
         ]
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+'''
+\brief The packets generated by the application of the motes (trafficModel).
+'''
+
+#============================ imports =========================================
+
+import random
+
+import numpy
+
+import SimEngine
+import SimSettings
+
+#============================ defines =========================================
+
+#============================ body ============================================
+
+class TrafficModel(object):
+    '''
+    Draws the arrival times of the packets of all motes for the whole run
+    at once, then enqueues them with a single pending engine event (at the
+    next ASN with arrivals), instead of one event per packet per mote.
+
+    Models, at an average of one packet per pkPeriod per mote:
+    - 'poisson': exponential times between packets.
+    - 'bursty': bursts of numPacketsBurst packets (one per slot), the bursts
+      are Poisson with an average period of numPacketsBurst*pkPeriod.
+    - 'trace': the arrivals read from trafficTrace, one '<moteId> <time (s)>'
+      per line.
+
+    Packets are generated from trafficStart (s) until the start of cycle
+    trafficStop. The 'periodic' model is not handled here, the motes
+    schedule their packets one by one (Mote._app_schedule_sendSinglePacket).
+    '''
+
+    def __init__(self,motes):
+
+        # store params
+        self.motes                     = motes
+
+        # local variables
+        self.engine                    = SimEngine.SimEngine()
+        self.settings                  = SimSettings.SimSettings()
+        self.rand                      = numpy.random.RandomState(random.randint(0,2**31-1))
+        self.nextArrival               = 0
+
+        # all arrivals, sorted by ASN
+        (self.arrivalAsns,self.arrivalMotes) = self._generateArrivals()
+
+        self._schedule_arrivals()
+
+    #======================== private =========================================
+
+    def _generateArrivals(self):
+        slotDuration   = self.settings.slotDuration
+        startAsn       = max(int(self.settings.trafficStart/slotDuration),1)
+        stopAsn        = min(self.settings.trafficStop,self.settings.numCyclesPerRun)*self.settings.slotframeLength
+        motes          = [m.id for m in self.motes if not m.dagRoot]
+        duration       = (stopAsn-startAsn)*slotDuration
+
+        if self.settings.trafficModel=='poisson':
+            times      = self._drawPoisson(len(motes),self.settings.pkPeriod,duration)
+        elif self.settings.trafficModel=='bursty':
+            burstSize  = self.settings.numPacketsBurst
+            bursts     = self._drawPoisson(len(motes),self.settings.pkPeriod*burstSize,duration)
+            times      = bursts[:,:,None]+slotDuration*numpy.arange(burstSize)
+            times      = times.reshape(len(motes),-1)
+        elif self.settings.trafficModel=='trace':
+            return self._readTrace(startAsn,stopAsn)
+        else:
+            raise ValueError('unknown trafficModel {0}'.format(self.settings.trafficModel))
+
+        asns           = startAsn+(times/slotDuration).astype(numpy.int64)
+        moteIds        = numpy.repeat(numpy.array(motes,dtype=numpy.int32)[:,None],times.shape[1],axis=1)
+        valid          = (times<duration) & (asns<stopAsn)
+        return self._sort(asns[valid],moteIds[valid])
+
+    def _drawPoisson(self,numMotes,period,duration):
+        ''' arrival times (s) of numMotes Poisson processes, at least up to duration, one row per mote '''
+        numDraws       = int(duration/period*1.5)+10
+        times          = numpy.cumsum(self.rand.exponential(period,(numMotes,numDraws)),axis=1)
+        while numMotes and times[:,-1].min()<duration:
+            more       = numpy.cumsum(self.rand.exponential(period,(numMotes,numDraws)),axis=1)
+            times      = numpy.hstack([times,times[:,-1:]+more])
+        return times
+
+    def _readTrace(self,startAsn,stopAsn):
+        trace          = numpy.loadtxt(self.settings.trafficTrace,ndmin=2)
+        moteIds        = trace[:,0].astype(numpy.int32)
+        asns           = (trace[:,1]/self.settings.slotDuration).astype(numpy.int64)
+        valid          = (asns>=startAsn) & (asns<stopAsn) & (moteIds>0) & (moteIds<len(self.motes))
+        return self._sort(asns[valid],moteIds[valid])
+
+    def _sort(self,asns,moteIds):
+        order          = numpy.argsort(asns,kind='mergesort')
+        return (asns[order].tolist(),moteIds[order].tolist())
+
+    def _schedule_arrivals(self):
+        if self.nextArrival<len(self.arrivalAsns):
+            self.engine.scheduleAtAsn(
+                asn         = self.arrivalAsns[self.nextArrival],
+                cb          = self._action_arrivals,
+                uniqueTag   = (None,'_app_action_arrivals'),
+                priority    = 2,
+            )
+
+    def _action_arrivals(self):
+        ''' the packets of all motes generated at this ASN '''
+        asn = self.engine.getAsn()
+        while self.nextArrival<len(self.arrivalAsns) and self.arrivalAsns[self.nextArrival]==asn:
+            self.motes[self.arrivalMotes[self.nextArrival]]._app_action_enqueueData()
+            self.nextArrival += 1
+        self._schedule_arrivals()
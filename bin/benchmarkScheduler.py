@@ -0,0 +1,160 @@
+#!/usr/bin/python
+'''
+\brief Benchmark the conflicting-cells query of the opt2 scheduler.
+
+For each network size, fills the schedules with random links, then compares
+the per-mote RSSI scan the opt2 responder used to do with the occupancy
+index (Occupancy.getConflictingCells), checking they return the same cells.
+
+Use '--help' for a list of parameters.
+'''
+
+#============================ adjust path =====================================
+
+import os
+import sys
+if __name__=='__main__':
+    here = sys.path[0]
+    sys.path.insert(0, os.path.join(here, '..'))
+
+#============================ imports =========================================
+
+import time
+import random
+import argparse
+import multiprocessing
+
+from SimEngine     import SimEngine,   \
+                          SimSettings
+
+import runSimOneCPU
+
+#============================ helpers =========================================
+
+def parseCliOptions():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument( '--numMotes',
+        dest       = 'numMotes',
+        nargs      = '+',
+        type       = int,
+        default    = [50,200],
+        help       = '[topology] Number of motes, one benchmark per value.',
+    )
+    parser.add_argument( '--squareSide',
+        dest       = 'squareSide',
+        type       = float,
+        default    = 2.000,
+        help       = '[topology] Side of the deployment area (km).',
+    )
+    parser.add_argument( '--slotframeLength',
+        dest       = 'slotframeLength',
+        type       = int,
+        default    = 101,
+        help       = '[TSCH] Number of timeslots in a slotframe.',
+    )
+    parser.add_argument( '--numChans',
+        dest       = 'numChans',
+        type       = int,
+        default    = 16,
+        help       = '[phy] Number of frequency channels.',
+    )
+    parser.add_argument( '--numCellsPerMote',
+        dest       = 'numCellsPerMote',
+        type       = int,
+        default    = 4,
+        help       = '[bench] Number of TX cells added per mote before measuring.',
+    )
+    parser.add_argument( '--numQueries',
+        dest       = 'numQueries',
+        type       = int,
+        default    = 200,
+        help       = '[bench] Number of queries measured per number of motes.',
+    )
+
+    options        = parser.parse_args()
+
+    return options.__dict__
+
+def scanConflictingCells(mote,neighbor,motes):
+    ''' the RSSI checks the opt2 responder did for each mote of the network '''
+    blocked = 0
+    for m in motes:
+        if m != mote and m != neighbor:
+            if mote.getRSSI(m)+(-97-(-105)) >= m.minRssi:
+                blocked |= m.schedule.txBitmap
+                if m.getRSSI(neighbor)+(-97-(-105)) >= mote.minRssi:
+                    blocked |= m.schedule.rxBitmap
+            if neighbor.getRSSI(m)+(-97-(-105)) >= m.minRssi:
+                blocked |= m.schedule.rxBitmap
+                if mote.getRSSI(m)+(-97-(-105)) >= mote.minRssi:
+                    blocked |= m.schedule.txBitmap
+    return blocked
+
+def runOneSize(params):
+    ''' benchmark one network size, in a fresh process '''
+
+    (numMotes,options) = params
+
+    SimSettings.SimSettings(**runSimOneCPU.getDefaultSettings(
+        numMotes                 = numMotes,
+        squareSide               = options['squareSide'],
+        scheduler                = 'opt2',
+        numChans                 = options['numChans'],
+        slotframeLength          = options['slotframeLength'],
+    ))
+    engine = SimEngine.SimEngine()
+    motes  = engine.motes
+
+    # fill the schedules with random links
+    links  = []
+    for mote in motes:
+        neighbors = mote._myNeigbors()
+        if not neighbors:
+            continue
+        neighbor  = random.choice(neighbors)
+        free      = mote.schedule.bitmapToCells(mote.schedule.getFreeBitmap() & ~neighbor.schedule.usedBitmap)
+        for (ts,ch) in random.sample(free,min(len(free),options['numCellsPerMote'])):
+            mote._tsch_addCells(neighbor,[(ts,ch,mote.DIR_TX)])
+            neighbor._tsch_addCells(mote,[(ts,ch,mote.DIR_RX)])
+        links    += [(mote,neighbor)]
+
+    queries   = [random.choice(links) for _ in range(options['numQueries'])]
+
+    startTime = time.time()
+    scanned   = [scanConflictingCells(m,n,motes) for (m,n) in queries]
+    scanTime  = time.time()-startTime
+
+    startTime = time.time()
+    indexed   = [engine.occupancy.getConflictingCells(m,n) for (m,n) in queries]
+    indexTime = time.time()-startTime
+
+    # the cells of both ends of the link are excluded by the responder anyway
+    for ((m,n),a,b) in zip(queries,scanned,indexed):
+        mask = ~(m.schedule.usedBitmap | n.schedule.usedBitmap)
+        assert a & mask == b & mask
+
+    return (numMotes,scanTime,indexTime,len(queries))
+
+#============================ main ============================================
+
+def main():
+
+    options        = parseCliOptions()
+
+    pool           = multiprocessing.Pool(1,maxtasksperchild=1)
+    results        = pool.map(runOneSize,[(n,options) for n in options['numMotes']])
+    pool.close()
+    pool.join()
+
+    for (numMotes,scanTime,indexTime,numQueries) in results:
+        print 'numMotes={0} queries={1}: scan {2:.3f}ms/query, index {3:.3f}ms/query ({4:.0f}x)'.format(
+            numMotes,
+            numQueries,
+            1000*scanTime/numQueries,
+            1000*indexTime/numQueries,
+            scanTime/max(indexTime,1e-9),
+        )
+
+if __name__=="__main__":
+    main()
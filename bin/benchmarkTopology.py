@@ -0,0 +1,202 @@
+#!/usr/bin/python
+'''
+\brief Benchmark and validate the topology creator.
+
+Generates many topologies for each network size across a pool of processes,
+computes the hop-count distribution to the DAG root (using links with PDR
+above a threshold) and records the time needed to create each topology.
+
+Use '--help' for a list of parameters.
+'''
+
+#============================ adjust path =====================================
+
+import os
+import sys
+if __name__=='__main__':
+    here = sys.path[0]
+    sys.path.insert(0, os.path.join(here, '..'))
+
+#============================ imports =========================================
+
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from SimEngine     import SimEngine,   \
+                          SimSettings, \
+                          Topology
+
+import runSimOneCPU
+
+#============================ defines =========================================
+
+UNREACHABLE = -1
+
+#============================ helpers =========================================
+
+def parseCliOptions():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument( '--numMotes',
+        dest       = 'numMotes',
+        nargs      = '+',
+        type       = int,
+        default    = [50],
+        help       = '[topology] Number of motes, one benchmark per value.',
+    )
+    parser.add_argument( '--numTopologies',
+        dest       = 'numTopologies',
+        type       = int,
+        default    = 100,
+        help       = '[topology] Number of topologies generated per number of motes.',
+    )
+    parser.add_argument( '--squareSide',
+        dest       = 'squareSide',
+        type       = float,
+        default    = 2.000,
+        help       = '[topology] Side of the deployment area (km).',
+    )
+    parser.add_argument( '--minRssi',
+        dest       = 'minRssi',
+        type       = int,
+        default    = -97,
+        help       = '[phy] Mininum RSSI with positive PDR (dBm).',
+    )
+    parser.add_argument( '--minPdr',
+        dest       = 'minPdr',
+        type       = float,
+        default    = 0.5,
+        help       = '[stats] Minimum PDR for a link to count as a hop.',
+    )
+    parser.add_argument( '--numCPUs',
+        dest       = 'numCPUs',
+        type       = int,
+        default    = multiprocessing.cpu_count(),
+        help       = '[bench] Number of worker processes.',
+    )
+    parser.add_argument( '--chunkSize',
+        dest       = 'chunkSize',
+        type       = int,
+        default    = 10,
+        help       = '[bench] Number of topologies generated per worker task.',
+    )
+    parser.add_argument( '--outputFile',
+        dest       = 'outputFile',
+        type       = str,
+        default    = None,
+        help       = '[bench] Append the results to this file.',
+    )
+
+    options        = parser.parse_args()
+
+    return options.__dict__
+
+def computeHops(motes,minPdr):
+    '''
+    Vectorized BFS from the DAG root (mote 0) over the PDR matrix.
+
+    Returns an array with the hop count of each mote, UNREACHABLE if it
+    cannot reach the root through links with PDR above minPdr.
+    '''
+
+    numMotes  = len(motes)
+    pdr       = np.zeros((numMotes,numMotes))
+    for mote in motes:
+        for (neighbor,p) in mote.PDR.items():
+            pdr[mote.id,neighbor.id] = p
+    adjacency = pdr>minPdr
+
+    hops      = np.empty(numMotes,dtype=int)
+    hops.fill(UNREACHABLE)
+    hops[0]   = 0
+    frontier  = np.zeros(numMotes,dtype=bool)
+    frontier[0] = True
+    hop       = 0
+    while frontier.any():
+        hop  += 1
+        frontier = adjacency[frontier].any(axis=0) & (hops==UNREACHABLE)
+        hops[frontier] = hop
+
+    return hops
+
+def runOneChunk(params):
+    ''' generate a chunk of topologies of the same size, in a fresh process '''
+
+    (numMotes,seeds,options) = params
+
+    # the motes need the engine singleton, which creates and boots them
+    SimSettings.SimSettings(**runSimOneCPU.getDefaultSettings(
+        numMotes                 = numMotes,
+        squareSide               = options['squareSide'],
+        minRssi                  = options['minRssi'],
+        scheduler                = 'none',
+    ))
+    motes = SimEngine.SimEngine().motes
+
+    returnVal = []
+    for seed in seeds:
+        for mote in motes:
+            mote.RSSI = {}
+            mote.PDR  = {}
+
+        startTime = time.time()
+        Topology.Topology(motes,seed=seed).createTopology()
+        genTime   = time.time()-startTime
+
+        returnVal += [(genTime,computeHops(motes,options['minPdr']))]
+
+    return returnVal
+
+def summarize(numMotes,results):
+    genTimes  = np.array([t for (t,_) in results])
+    allHops   = np.concatenate([h for (_,h) in results])
+    reachable = allHops[allHops!=UNREACHABLE]
+    histogram = np.bincount(reachable)
+
+    output    = []
+    output   += ['numMotes={0} numTopologies={1}'.format(numMotes,len(results))]
+    output   += ['    genTime (s):   ave={0:.4f} std={1:.4f} max={2:.4f}'.format(genTimes.mean(),genTimes.std(),genTimes.max())]
+    output   += ['    hops:          ave={0:.3f} max={1} unreachable={2}'.format(reachable.mean(),reachable.max(),len(allHops)-len(reachable))]
+    output   += ['    hop histogram: {0}'.format(' '.join(['{0}@{1}'.format(h,n) for (h,n) in enumerate(histogram) if n]))]
+    return '\n'.join(output)
+
+#============================ main ============================================
+
+def main():
+
+    options        = parseCliOptions()
+
+    # one task per chunk of topologies; each task runs in its own process
+    # since the simulator singletons are bound to one number of motes
+    tasks          = []
+    for numMotes in options['numMotes']:
+        seeds      = range(options['numTopologies'])
+        for i in range(0,len(seeds),options['chunkSize']):
+            tasks += [(numMotes,seeds[i:i+options['chunkSize']],options)]
+
+    startTime      = time.time()
+    pool           = multiprocessing.Pool(options['numCPUs'],maxtasksperchild=1)
+    chunks         = pool.map(runOneChunk,tasks)
+    pool.close()
+    pool.join()
+
+    # group results per number of motes
+    resultsPerSize = {}
+    for ((numMotes,_,_),chunk) in zip(tasks,chunks):
+        resultsPerSize.setdefault(numMotes,[])
+        resultsPerSize[numMotes] += chunk
+
+    output         = [summarize(n,resultsPerSize[n]) for n in sorted(resultsPerSize)]
+    output        += ['benchmark ended after {0:.1f}s.'.format(time.time()-startTime)]
+    output         = '\n'.join(output)
+
+    print output
+    if options['outputFile']:
+        with open(options['outputFile'],'a') as f:
+            f.write(output+'\n')
+
+if __name__=="__main__":
+    main()
@@ -9,13 +9,7 @@ from pylab import *
 import csv
 
 def parse(filename):
-	
-    cycleInit=63
-    cycleEnd=97
-    maxCycles=100
-
 
-    cycles=cycleEnd-cycleInit #end receiving - start receiving	
     command="find "
     args='{0} -name output* | sort -V'.format(filename)
 
@@ -23,196 +17,110 @@ def parse(filename):
     tmp = os.popen(command+args).read()
     listOfFiles=tmp.split("\n")
     data_dict={}
-     
-    currentNumNodes=None 
-	
-    for filename in listOfFiles:
-        i=0
-        numRuns=None 	
-	runParsed=None	
-	
-		
-	if filename != "":
-	    
-	    print "Filtering: "+str(filename)
-            nodes=filename.split("_")[10]
-	    if currentNumNodes==None or nodes!=currentNumNodes:
-		currentNumNodes=nodes
-		
-		OL=[]
-		throughput=[]
-		PER=[]#not used here
-		TXpkt=[]
-		RXpkt=[]
-		collisionDrops=[]
-	        propagationDrops=[]
-		dropsMAC=[]
-		dropsAPP=[]
-		delay=[]
-		battery=[]
-		avgHops=[]
-		rplParentChanges=[]
-		avgEffectiveCollided=[]
-		numTx=[]
-		numRx=[]
-		avgRTX=[]#not used here
-		usedCells=[]
-		reqCells=[]
-		randomSelections=[]
-		txbroad=[]
-		rxbroad=[]
-		PERBroad=[]   #not used here
-		otf_messages=[]
-	    
-
-            infile = open(filename, 'r')
-
-	    	
-	    dropsMAC_values=None
-            dropsAPP_values=None
-	    delay_values=None
-	    rpl_values=None
-
-	    battery_values=[]
-	    avgHops_values=None
-	    avgEffectiveCollided_values=None
-	    usedCells_values=0
-            reqCells_values=0
-	    randomSelections_values=None
-	    txbroad_values=None
-	    rxbroad_values=None
-	    otf_messages_add=0
-	    otf_messages_remove=0
-	    otf_messages_values=None
-
-	    for line in infile:
-	        if i==5:
-		    #print delay
-		    numMotes=int(line.split(" ")[3])
-		    
-	        if i==24:
-		    numRuns=int(line.split(" ")[3])
-	            runParsed=1
-
-	        if (numRuns!=None) and (runParsed<=numRuns):
-	            if i==(29+(runParsed*(maxCycles+6))):			
-			OL.append(float(line.split(" ")[7])*128*8)
-
-			throughput.append(float(line.split(" ")[9])*128*8)
-
-			numTx.append(float(line.split(" ")[13]))
-			numRx.append(float(line.split(" ")[15]))
-			TXpkt.append(int(line.split(" ")[3]))
-			RXpkt.append(int(line.split(" ")[5]))
-			
-			collisionDrops.append(int(line.split(" ")[11]))
-	    		propagationDrops.append(int(line.split(" ")[17]))
-
-
-			runParsed+=1
 
-		    if i>=((33+(runParsed*(maxCycles+6)))-(maxCycles+6)) and i<=((33+(runParsed*(maxCycles+6)))-7):	
-			if rpl_values!=None:	
-				rpl_values=int(line.split()[29])+int(rpl_values)
-			else:
-				rpl_values=int(line.split()[29])
-			if dropsMAC_values!= None:
-				dropsMAC_values=int(line.split()[14])+int(dropsMAC_values)
-			else:
-				dropsMAC_values=int(line.split()[14])
-			if dropsAPP_values!= None:
-				dropsAPP_values=int(line.split()[13])+int(dropsAPP_values)
-			else:
-				dropsAPP_values=int(line.split()[13])
-			if txbroad_values!=None:
-				txbroad_values=int(line.split()[40])+int(txbroad_values)
-			else:
-				txbroad_values=int(line.split()[40])
-			if rxbroad_values!=None:
-				rxbroad_values=int(line.split()[34])+int(rxbroad_values)
-			else:
-				rxbroad_values=int(line.split()[34])
-			if otf_messages_values!=None:
-				otf_messages_add=int(line.split()[25])+int(otf_messages_add)
-				otf_messages_remove=int(line.split()[26])+int(otf_messages_remove)
-				otf_messages_values=otf_messages_add+otf_messages_remove
-			else:
-				otf_messages_add=int(line.split()[25])
-				otf_messages_remove=int(line.split()[26])
-				otf_messages_values=otf_messages_add+otf_messages_remove
-			if randomSelections_values!=None:
-				randomSelections_values=int(line.split()[19])+int(randomSelections_values)
-			else:
-				randomSelections_values=int(line.split()[19])
-			
-			if i>=((33+cycleInit+(runParsed*(maxCycles+6)))-(maxCycles+6)) and i<=((33+(runParsed*(maxCycles+6)))-7-(maxCycles-cycleEnd)):
-				if avgEffectiveCollided_values!=None:	
-					avgEffectiveCollided_values=int(line.split()[18])+int(avgEffectiveCollided_values)
-				else:
-					avgEffectiveCollided_values=int(line.split()[18])
-				if delay_values!=None:	
-					delay_values=float(line.split()[7])+float(delay_values)
-				else:
-					delay_values=float(line.split()[7])
-				if avgHops_values!=None:	
-					avgHops_values=float(line.split()[5])+float(avgHops_values)
-				else:
-					avgHops_values=float(line.split()[5])
-				usedCells_values=float(line.split()[24])+float(usedCells_values)
-				reqCells_values=float(line.split()[20])+float(reqCells_values)
-				#print "cycle "+str(line.split()[12]) + " hops "+str(line.split()[5])
-			if i==((29+(runParsed*(maxCycles+6)))-3):
-				battery_values.append(float(line.split()[10]))
-		    else:
-			if rpl_values!=None:
-
-				rplParentChanges.append(float(rpl_values/numMotes))
-				rpl_values=None
-			if dropsMAC_values!=None:
-				dropsMAC.append(int(dropsMAC_values))
-				dropsMAC_values=None
-			if dropsAPP_values!=None:	
-				dropsAPP.append(int(dropsAPP_values))
-				dropsAPP_values=None
-			if delay_values!=None:				
-				delay.append(float(0.01*delay_values/cycles))
-				delay_values=None
-
-			if battery_values!=[]:
-				battery_values=[num for num in battery_values if num ]	
-				battery.append(np.mean(battery_values)/numMotes)
-				print "Battery "+str(battery)
-				battery_values=[]
-			if avgHops_values!=None:				
-				avgHops.append(avgHops_values/cycles)		
-				avgHops_values=None
-			if reqCells_values!=0:
-				reqCells.append(reqCells_values/cycles)		
-				reqCells_values=0
-			if usedCells_values!=0:
-				usedCells.append(usedCells_values/cycles)		
-				usedCells_values=0
-			if txbroad_values!=None:	
-				txbroad.append(int(txbroad_values))
-				txbroad_values=None
-			if rxbroad_values!=None:	
-				rxbroad.append(int(rxbroad_values))
-				rxbroad_values=None
-			if avgEffectiveCollided_values!=None:	
-				avgEffectiveCollided.append(int(avgEffectiveCollided_values/cycles))
-				avgEffectiveCollided_values=None
-			if randomSelections_values!=None:	
-				randomSelections.append(int(randomSelections_values))
-				randomSelections_values=None
-			if otf_messages_values!=None:	 
-				otf_messages.append(int(otf_messages_values))
-				otf_messages_values=None
-				otf_messages_add=0
-				otf_messages_remove=0
-				
+    currentNumNodes=None
 
-	        i+=1
-	    data_dict[int(nodes)]=(OL,throughput,PER,TXpkt,RXpkt,collisionDrops,propagationDrops,dropsMAC,dropsAPP,delay,battery,avgHops,rplParentChanges,avgEffectiveCollided,numTx,numRx,usedCells,reqCells,randomSelections,txbroad,rxbroad,otf_messages)    	    
+    for filename in listOfFiles:
+        if filename == "":
+            continue
+
+        print "Filtering: "+str(filename)
+
+        infile = open(filename, 'r')
+        lines = infile.readlines()
+        infile.close()
+
+        # settings are read by name from the header, and columns by name from the column line
+        header = dict([l[3:].rstrip('\n').split(' = ',1) for l in lines if l.startswith('## ')])
+        numMotes = int(header['numMotes'])
+        columns = [l.split()[1:] for l in lines if l.startswith('# ')][0]
+        col = dict([(name,idx) for (idx,name) in enumerate(columns)])
+
+        # measurement window, in cycles (files without these settings used 63 and 33)
+        cycleInit = int(header.get('warmupCycles',63))
+        cycleEnd = cycleInit+int(header.get('measurementCycles',33))
+        cycles = cycleEnd-cycleInit+1
+
+        nodes = numMotes
+        if currentNumNodes==None or nodes!=currentNumNodes:
+            currentNumNodes=nodes
+
+            OL=[]
+            throughput=[]
+            PER=[]#not used here
+            TXpkt=[]
+            RXpkt=[]
+            collisionDrops=[]
+            propagationDrops=[]
+            dropsMAC=[]
+            dropsAPP=[]
+            delay=[]
+            battery=[]
+            avgHops=[]
+            rplParentChanges=[]
+            avgEffectiveCollided=[]
+            numTx=[]
+            numRx=[]
+            avgRTX=[]#not used here
+            usedCells=[]
+            reqCells=[]
+            randomSelections=[]
+            txbroad=[]
+            rxbroad=[]
+            PERBroad=[]   #not used here
+            otf_messages=[]
+
+        # the rows of each run, and its '#results' line
+        rows = collections.OrderedDict()
+        results = {}
+        for line in lines:
+            if line.startswith('#results'):
+                t = line.split()
+                results[int(t[1].split('=')[1])] = dict(zip(t[2::2],t[3::2]))
+            elif line.strip() and not line.startswith('#'):
+                values = line.split()
+                rows.setdefault(int(values[col['runNum']]),[]).append(values)
+
+        for (runNum,runRows) in rows.items():
+            if runNum not in results:
+                continue # run not finished
+            res = results[runNum]
+
+            OL.append(float(res['totalOLGenerated'])*128*8)
+            throughput.append(float(res['totalThReceived'])*128*8)
+            numTx.append(float(res['totalTX']))
+            numRx.append(float(res['totalRX']))
+            TXpkt.append(int(res['totalPacketSent']))
+            RXpkt.append(int(res['totalPacketReceived']))
+            collisionDrops.append(int(res['dropsByCollisions']))
+            propagationDrops.append(int(res['dropsPropagation']))
+
+            # over the whole run
+            total = lambda name: reduce(operator.add,[int(r[col[name]]) for r in runRows],0)
+            rplParentChanges.append(float(total('rplChurnPrefParent')/numMotes))
+            dropsMAC.append(total('droppedMacRetries'))
+            dropsAPP.append(total('droppedAppFailedEnqueue'))
+            txbroad.append(total('txBroadcast'))
+            rxbroad.append(total('rxBroadcast'))
+            otf_messages.append(total('otfAdd')+total('otfRemove'))
+            randomSelections.append(total('numRandomSelections'))
+
+            # over the measurement window (summed in order, pylab's sum() is numpy's)
+            window = [r for r in runRows if cycleInit<=int(r[col['cycle']])<=cycleEnd]
+            windowTotal = lambda name: reduce(operator.add,[float(r[col[name]]) for r in window],0.0)
+            avgEffectiveCollided.append(int(reduce(operator.add,[int(r[col['effectiveCollidedTxs']]) for r in window],0)/cycles))
+            delay.append(float(0.01*windowTotal('aveLatency')/cycles))
+            avgHops.append(windowTotal('aveHops')/cycles)
+            if windowTotal('numTxCells')!=0:
+                usedCells.append(windowTotal('numTxCells')/cycles)
+            if windowTotal('numReqCells')!=0:
+                reqCells.append(windowTotal('numReqCells')/cycles)
+
+            battery_values=[num for num in [float(runRows[-1][col['chargeConsumed']])] if num]
+            battery.append(np.mean(battery_values)/numMotes)
+            print "Battery "+str(battery)
+
+        data_dict[int(nodes)]=(OL,throughput,PER,TXpkt,RXpkt,collisionDrops,propagationDrops,dropsMAC,dropsAPP,delay,battery,avgHops,rplParentChanges,avgEffectiveCollided,numTx,numRx,usedCells,reqCells,randomSelections,txbroad,rxbroad,otf_messages)
     print "End parsing"
 
     return data_dict
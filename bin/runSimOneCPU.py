@@ -46,7 +46,7 @@ from SimEngine     import SimEngine,   \
 
 #============================ helpers =========================================
 
-def parseCliOptions():
+def parseCliOptions(args=None):
     
     parser = argparse.ArgumentParser()
     # sim
@@ -74,12 +74,30 @@ def parseCliOptions():
         default    = 100,
         help       = '[simulation] Duration of a run, in slotframes.',
     )
+    parser.add_argument('--warmupCycles',
+        dest       = 'warmupCycles',
+        type       = int,
+        default    = None,
+        help       = '[simulation] Number of slotframes before the measurement window (default 63%% of numCyclesPerRun).',
+    )
+    parser.add_argument('--measurementCycles',
+        dest       = 'measurementCycles',
+        type       = int,
+        default    = None,
+        help       = '[simulation] Duration of the measurement window (throughput, latency, ...), in slotframes (default 33%% of numCyclesPerRun, ends before the run).',
+    )
     parser.add_argument('--simDataDir',
         dest       = 'simDataDir',
         type       = str,
         default    = 'simData',
         help       = '[simulation] Simulation log directory.',
     )
+    parser.add_argument('--stateArrays',
+        dest       = 'stateArrays',
+        type       = int,
+        default    = 0,
+        help       = '[simulation] 1 to store the state of the motes, and the RSSI/PDR between them, in arrays of the network (less memory for large networks).',
+    )
     # topology
     parser.add_argument( '--numMotes',
         dest       = 'numMotes',
@@ -122,6 +140,31 @@ def parseCliOptions():
         default    = 5,
         help       = '[app] Number of packets in a burst, per node.',
     )
+    parser.add_argument( '--trafficModel',
+        dest       = 'trafficModel',
+        type       = str,
+        choices    = ['periodic','poisson','bursty','trace'],
+        default    = 'periodic',
+        help       = '[app] Arrivals of the data packets: every pkPeriod with pkPeriodVar jitter, Poisson, bursts of numPacketsBurst packets, or read from trafficTrace.',
+    )
+    parser.add_argument( '--trafficTrace',
+        dest       = 'trafficTrace',
+        type       = str,
+        default    = '',
+        help       = '[app] File of the arrivals for trafficModel trace, one "<moteId> <time (s)>" per line.',
+    )
+    parser.add_argument( '--trafficStart',
+        dest       = 'trafficStart',
+        type       = float,
+        default    = 16,
+        help       = '[app] Time the motes start sending data packets (s), periodic traffic starts between trafficStart and twice trafficStart.',
+    )
+    parser.add_argument( '--trafficStop',
+        dest       = 'trafficStop',
+        type       = int,
+        default    = None,
+        help       = '[app] Cycle the motes stop sending data packets (default 96%% of numCyclesPerRun).',
+    )
     # rpl
     parser.add_argument( '--dioPeriod',
         dest       = 'dioPeriod',
@@ -129,6 +172,24 @@ def parseCliOptions():
         default    = 1.0,
         help       = '[rpl] DIO period (s).',
     )
+    parser.add_argument( '--rplBatchHousekeeping',
+        dest       = 'rplBatchHousekeeping',
+        type       = int,
+        default    = 0,
+        help       = '[rpl] 1 to run the RPL housekeeping once per batch of DIOs received, instead of once per DIO.',
+    )
+    parser.add_argument( '--rplTrickle',
+        dest       = 'rplTrickle',
+        type       = int,
+        default    = 0,
+        help       = '[rpl] 1 to send the DIOs with a Trickle timer (Imin=dioPeriod), instead of every dioPeriod.',
+    )
+    parser.add_argument( '--rplOracle',
+        dest       = 'rplOracle',
+        type       = int,
+        default    = 0,
+        help       = '[rpl] 1 to compute the shortest ETX paths to the root at boot, instead of running RPL (no DIOs).',
+    )
     # otf
     parser.add_argument( '--otfThreshold',
         dest       = 'otfThreshold',
@@ -143,6 +204,12 @@ def parseCliOptions():
         default    = 5.0,
         help       = '[otf] OTF housekeeping period (s).',
     )
+    parser.add_argument( '--otfSynchronized',
+        dest       = 'otfSynchronized',
+        type       = int,
+        default    = 0,
+        help       = '[otf] 1 to run the OTF housekeeping of all motes at once every otfHousekeepingPeriod, instead of per mote with jitter.',
+    )
     # sixtop
     parser.add_argument( '--sixtopHousekeepingPeriod',
         dest       = 'sixtopHousekeepingPeriod',
@@ -231,6 +298,19 @@ def parseCliOptions():
         default    = 0,
         help       = '[tsch] % of overlapping allowed  in broadcast cells.',    #not used anymore
     )
+    # battery
+    parser.add_argument( '--batteryCapacity',
+        dest       = 'batteryCapacity',
+        type       = float,
+        default    = 2200,
+        help       = '[battery] Capacity of the battery of the motes (mAh), for the lifetime projection.',
+    )
+    parser.add_argument('--cellDebugHistory',
+        dest       = 'cellDebugHistory',
+        type       = int,
+        default    = 0,
+        help       = '[debug] Number of interference debug entries kept per cell (0 to disable).',
+    )
     parser.add_argument('--generateIndividualSummarys',
         dest       = 'generateIndividualSummarys',
         nargs      = '+',
@@ -239,10 +319,32 @@ def parseCliOptions():
         help       = '[debug] add individual summarys per node for Throughput.',
     )
     
-    options        = parser.parse_args()
+    options        = parser.parse_args(args)
+    
+    if options.trafficModel=='trace' and not options.trafficTrace:
+        parser.error('--trafficModel trace needs a --trafficTrace file')
+    
+    # the window and the end of the traffic follow the length of the run (63, 33 and 96 of 100 cycles)
+    numCycles      = options.numCyclesPerRun
+    if options.warmupCycles==None:
+        options.warmupCycles      = numCycles*63/100
+    if options.measurementCycles==None:
+        options.measurementCycles = min(numCycles*33/100,numCycles-1-options.warmupCycles)
+    if options.trafficStop==None:
+        options.trafficStop       = numCycles*96/100
+    if options.warmupCycles<0 or options.measurementCycles<1 or options.warmupCycles+options.measurementCycles>=numCycles:
+        parser.error('the measurement window (warmupCycles+measurementCycles) must end before numCyclesPerRun')
+    if options.trafficStop>numCycles:
+        parser.error('trafficStop must be at most numCyclesPerRun')
     
     return options.__dict__
 
+def getDefaultSettings(**settings):
+    ''' the default options, as settings of a simulation, overridden by settings '''
+    returnVal      = parseCliOptions([])
+    returnVal.update(settings)
+    return returnVal
+
 def printOrLog(simParam,output):
     if simParam['cpuID']!=None:
 	print output